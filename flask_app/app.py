@@ -1,131 +1,475 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Blueprint, Flask, Response, render_template, request, jsonify, redirect
+from flask_compress import Compress
 import asyncio
-from playwright.async_api import async_playwright
-from scrapers.daraz import scrape_daraz
-from scrapers.priceoye import scrape_priceoye
-from database import db, ProductDatabase
-from apscheduler.schedulers.background import BackgroundScheduler
 import atexit
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+from scrapers.runner import run_scrapers
+from database import db, ProductDatabase, PRODUCT_FIELDS, SORT_ORDERS, CACHE_TTL_HOURS
+from browser_pool import BrowserPool
 
+# Start the background refresh scheduler only when explicitly enabled, so
+# that tests, CLI tools and extra server workers don't each run their own.
+ENABLE_SCHEDULER = os.environ.get("ENABLE_SCHEDULER", "0").lower() in ("1", "true", "yes")
 
-app = Flask(__name__)
+# Cache prewarming: scrape the top-N popular searches at startup and
+# shortly before their cache entries expire
+PREWARM_ON_STARTUP = os.environ.get("PREWARM_ON_STARTUP", "1").lower() in ("1", "true", "yes")
+PREWARM_TOP_N = int(os.environ.get("PREWARM_TOP_N", 10))  # Popular searches to consider
+PREWARM_BUDGET = int(os.environ.get("PREWARM_BUDGET", 5))  # Max scrapes per run
+PREWARM_CONCURRENCY = int(os.environ.get("PREWARM_CONCURRENCY", 2))  # Parallel scrapes
+PREWARM_AHEAD_MINUTES = int(os.environ.get("PREWARM_AHEAD_MINUTES", 10))  # Refresh before expiry
+PREWARM_HISTORY_DAYS = int(os.environ.get("PREWARM_HISTORY_DAYS", 7))  # Popularity window
 
-# Background scheduler for automatic data refresh
-scheduler = BackgroundScheduler()
+# Response compression, in order of preference
+COMPRESS_ALGORITHMS = ['br', 'gzip']
+
+# Largest page size a client may request per source
+MAX_PAGE_LIMIT = 100
+
+# Filtered cache invalidations above this many entries run in the background
+INVALIDATE_ASYNC_THRESHOLD = int(os.environ.get("INVALIDATE_ASYNC_THRESHOLD", 1000))
+
+# Longest time browsers and proxies may reuse a GET /api/search response
+# without revalidating (never beyond the cache entry's own expiry). The
+# default, 0, sends no-cache: responses are stored but revalidated on every
+# use (a cheap 304), so invalidations and refreshes are seen immediately.
+SEARCH_MAX_AGE_SECONDS = int(os.environ.get("SEARCH_MAX_AGE_SECONDS", 0))
+
+main = Blueprint('main', __name__, cli_group=None)
+
+# Background scheduler for automatic data refresh (created by start_scheduler)
+scheduler = None
+
+# Shared browsers, started on first scrape
+browser_pool = BrowserPool.from_env()
+
+# Event loop that owns the browser pool, run in a background thread
+_scraper_loop = None
+_scraper_loop_lock = threading.Lock()
+
+# Summary of the most recent prewarm run, reported by /api/cache/stats
+last_prewarm = None
+_prewarm_lock = threading.Lock()
+
+
+def _get_scraper_loop():
+    """Get the shared scraper event loop, starting its thread on first use."""
+    global _scraper_loop
+    
+    with _scraper_loop_lock:
+        if _scraper_loop is None:
+            _scraper_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_scraper_loop.run_forever,
+                name='scraper-loop',
+                daemon=True
+            ).start()
+            atexit.register(_shutdown_scraper_loop)
+    return _scraper_loop
+
+
+def _shutdown_scraper_loop():
+    """Close pooled browsers and stop the scraper event loop."""
+    try:
+        asyncio.run_coroutine_threadsafe(
+            browser_pool.shutdown(), _scraper_loop
+        ).result(timeout=10)
+    except Exception as e:
+        print(f"✗ Failed to shut down browser pool: {e}")
+    _scraper_loop.call_soon_threadsafe(_scraper_loop.stop)
+
+
+def use_scraper_loop(loop):
+    """
+    Run scrapes on an existing event loop instead of a background thread.
+    
+    Used by the ASGI app, so that its own scrapes, the Flask routes and
+    the scheduler jobs share one browser pool on the serving event loop.
+    """
+    global _scraper_loop
+    
+    with _scraper_loop_lock:
+        if _scraper_loop is not None and _scraper_loop is not loop:
+            raise RuntimeError('Scrapes already run on another event loop')
+        _scraper_loop = loop
 
 
 def run_async(coro):
-    """Run an async coroutine in a new event loop."""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    """
+    Run an async coroutine on the shared scraper event loop and wait for it.
+    
+    Browsers are bound to the loop they were launched on, so every scrape
+    runs on the same long-lived loop in order to reuse pooled browsers.
+    Must not be called from that loop's own thread.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_scraper_loop()).result()
+
+
+def parse_result_options(args) -> dict:
+    """
+    Parse pagination, sort and field selection query parameters.
+    
+    Raises:
+        ValueError: If a parameter is invalid
+    """
     try:
-        return loop.run_until_complete(coro)
-    finally:
-        loop.close()
+        page = int(args.get('page', 1))
+        limit = int(args['limit']) if args.get('limit') else None
+    except ValueError:
+        raise ValueError('Page and limit must be valid numbers')
+    
+    if page < 1:
+        raise ValueError('Page must be at least 1')
+    if limit is not None and not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise ValueError(f'Limit must be between 1 and {MAX_PAGE_LIMIT}')
+    # Without a limit the single page holds every product
+    if page > 1 and limit is None:
+        raise ValueError('Page requires a limit')
+    
+    sort = args.get('sort', 'price_asc')
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Sort must be one of: {', '.join(SORT_ORDERS)}")
+    
+    fields = None
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in PRODUCT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    
+    return {
+        'page': page,
+        'limit': limit,
+        'sort': sort,
+        'fields': fields,
+        'source': args.get('source') or None
+    }
+
+
+def parse_search_params(data) -> tuple:
+    """
+    Parse and validate search parameters from a request body or query string.
+    
+    Returns:
+        (country_code, product_type, min_price, max_price)
+    
+    Raises:
+        ValueError: If a parameter is missing or invalid
+    """
+    country_code = data.get('countryCode')
+    product_type = data.get('productType')
+    min_price = data.get('minPrice')
+    max_price = data.get('maxPrice')
+    
+    if not all([country_code, product_type, min_price, max_price]):
+        raise ValueError('All fields are required')
+    
+    try:
+        min_price = int(min_price)
+        max_price = int(max_price)
+    except ValueError:
+        raise ValueError('Price must be a valid number')
+    
+    if min_price < 0 or max_price < 0:
+        raise ValueError('Price cannot be negative')
+    
+    if min_price > max_price:
+        raise ValueError('Min price cannot be greater than max price')
+    
+    return country_code, product_type, min_price, max_price
+
+
+def canonical_search_query(params: tuple, options: dict) -> str:
+    """
+    Build the normalized query string for GET /api/search.
+    
+    Equivalent searches map to one URL so that browsers and proxies
+    share a single cache entry for them.
+    """
+    country_code, product_type, min_price, max_price = params
+    query = [
+        ('countryCode', country_code.strip().upper()),
+        ('productType', product_type.strip().lower()),
+        ('minPrice', min_price),
+        ('maxPrice', max_price)
+    ]
+    
+    # Defaults are left out
+    if options['page'] != 1:
+        query.append(('page', options['page']))
+    if options['limit']:
+        query.append(('limit', options['limit']))
+    if options['sort'] != 'price_asc':
+        query.append(('sort', options['sort']))
+    if options['fields']:
+        query.append(('fields', ','.join(sorted(set(options['fields'])))))
+    if options['source']:
+        query.append(('source', options['source']))
+    
+    return urlencode(query)
+
+
+def search_etag(query: str, cached_at: str) -> str:
+    """ETag for a cached search: changes whenever the cache entry is rewritten."""
+    return hashlib.md5(f"{query}|{cached_at}".encode()).hexdigest()
+
+
+def _etag_matches(req, etag: str) -> bool:
+    """Check If-None-Match against an ETag, ignoring any encoding suffix."""
+    if req.if_none_match.star_tag:
+        return True
+    # Compression appends the encoding (e.g. "abc:gzip"), so compare the base
+    return any(
+        tag.split(':')[0] == etag
+        for tag in req.if_none_match.as_set(include_weak=True)
+    )
+
+
+def is_not_modified(req, etag: str, last_modified: datetime) -> bool:
+    """
+    Evaluate a request's conditional headers against a cache entry.
+    
+    Works with any Werkzeug-style request (Flask or Quart).
+    """
+    if req.if_none_match:
+        return _etag_matches(req, etag)
+    if req.if_modified_since:
+        # HTTP dates have second precision
+        since = req.if_modified_since.replace(tzinfo=None)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def response_encoding(req):
+    """Content encoding that compression picks for a request, or None."""
+    # Honors q-values, including q=0 refusals; ties go to server preference
+    return req.accept_encodings.best_match(COMPRESS_ALGORITHMS)
+
+
+def encoded_etag(req, etag: str) -> str:
+    """
+    ETag as sent on a compressed response to this request.
+    
+    Compression appends the encoding to the ETag of a 200; a 304 is not
+    compressed, so it gets the same suffix here to carry the same validator.
+    """
+    encoding = response_encoding(req)
+    return f"{etag}:{encoding}" if encoding else etag
+
+
+def set_cache_headers(response, etag: str, last_modified: datetime):
+    """Attach validators and freshness lifetime for a cached search."""
+    expires_in = (
+        last_modified + timedelta(hours=CACHE_TTL_HOURS) - datetime.utcnow()
+    ).total_seconds()
+    max_age = max(0, min(int(expires_in), SEARCH_MAX_AGE_SECONDS))
+    
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.cache_control.public = True
+    if max_age:
+        # Responses may be up to max_age seconds stale after an invalidation
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+
+
+def is_new_search(options: dict) -> bool:
+    """Whether a request starts a search, rather than fetching a further page."""
+    return options['page'] == 1 and options['source'] is None
+
+
+def is_revalidated(req, query: str, entry) -> bool:
+    """Whether a GET /api/search request's validators match a fresh cache entry."""
+    if entry is None:
+        return False
+    etag = search_etag(query, entry['cached_at'].isoformat())
+    return is_not_modified(req, etag, entry['cached_at'])
+
+
+def finish_search_response(response, req, query: str, cached_at, timing: str, started: float):
+    """
+    Attach validators and Server-Timing to a GET /api/search response.
+    
+    Shared by the Flask and ASGI apps; `cached_at` is None for results
+    that could not be cached.
+    """
+    # Only results that made it into the cache can be revalidated
+    if cached_at is not None:
+        etag = search_etag(query, cached_at.isoformat())
+        if response.status_code == 304:
+            etag = encoded_etag(req, etag)
+        set_cache_headers(response, etag, cached_at)
+    else:
+        response.cache_control.no_store = True
+    
+    response.headers['Server-Timing'] = (
+        f"cache;desc={timing};dur={(time.perf_counter() - started) * 1000:.1f}"
+    )
+    return response
+
+
+def scraped_result(result: dict, options: dict) -> dict:
+    """Mark a freshly scraped (and saved) result and page it as requested."""
+    if result.get('grouped'):
+        result['cached'] = False
+        result['message'] = 'Fresh data scraped and cached'
+    
+    result.update(ProductDatabase.page_products(result['grouped'], **options))
+    return result
+
+
+def _scrape_and_cache(params: tuple, options: dict) -> dict:
+    """Scrape fresh data, cache it and return the requested page."""
+    country_code, product_type, min_price, max_price = params
+    
+    print(f"→ Scraping fresh data for: {product_type}")
+    result = run_async(
+        run_scraper(country_code, product_type, min_price, max_price)
+    )
+    
+    # Misses count as cold lookups even when the scrape found nothing
+    if is_new_search(options):
+        db.log_lookup(*params, result.get('count', 0), cache_hit=False)
+    
+    # Save to database if we got results
+    if result.get('grouped'):
+        db.save_products(
+            country_code, product_type, min_price, max_price,
+            result['grouped']
+        )
+    
+    return scraped_result(result, options)
 
 
-@app.route('/')
+@main.route('/')
 def index():
     """Render the main page."""
     return render_template('index.html')
 
 
-@app.route('/api/scrape', methods=['POST'])
+@main.route('/api/scrape', methods=['POST'])
 def scrape_products():
     """
     API endpoint to get products.
     First checks MongoDB cache, falls back to scraping if needed.
+    
+    Query parameters (all optional): page, limit (per source), sort
+    (price_asc, price_desc), fields (comma-separated) and source.
     """
     try:
         data = request.get_json()
         
         # Validate input
-        country_code = data.get('countryCode')
-        product_type = data.get('productType')
-        min_price = data.get('minPrice')
-        max_price = data.get('maxPrice')
-        force_refresh = data.get('forceRefresh', False)
-        
-        if not all([country_code, product_type, min_price, max_price]):
-            return jsonify({'error': 'All fields are required'}), 400
-        
         try:
-            min_price = int(min_price)
-            max_price = int(max_price)
-        except ValueError:
-            return jsonify({'error': 'Price must be a valid number'}), 400
-        
-        if min_price < 0 or max_price < 0:
-            return jsonify({'error': 'Price cannot be negative'}), 400
+            params = parse_search_params(data)
+            options = parse_result_options(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if min_price > max_price:
-            return jsonify({'error': 'Min price cannot be greater than max price'}), 400
+        force_refresh = data.get('forceRefresh', False)
         
         # Try to get from cache first (unless force refresh requested)
         if not force_refresh:
-            cached_result = db.get_cached_products(
-                country_code, product_type, min_price, max_price
-            )
-            if cached_result and cached_result.get('count', 0) > 0:
+            cached_result = db.get_cached_products(*params, **options)
+            if cached_result is not None:
                 print(f"✓ Returning cached data: {cached_result['count']} products")
                 return jsonify(cached_result)
         
         # Cache miss or force refresh - scrape fresh data
-        print(f"→ Scraping fresh data for: {product_type}")
-        result = run_async(
-            run_scraper(country_code, product_type, min_price, max_price)
-        )
+        return jsonify(_scrape_and_cache(params, options))
+    
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@main.route('/api/search', methods=['GET'])
+def search_products():
+    """
+    Cacheable GET variant of /api/scrape.
+    
+    Takes the /api/scrape body fields as query parameters, plus the same
+    paging options. Responses carry ETag and Last-Modified validators, and
+    revalidation answers 304 Not Modified without reading any products.
+    Non-normalized queries are redirected to their canonical URL.
+    """
+    started = time.perf_counter()
+    
+    try:
+        params = parse_search_params(request.args)
+        options = parse_result_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = canonical_search_query(params, options)
+    if request.query_string.decode() != query:
+        return redirect(f"{request.path}?{query}", code=301)
+    
+    try:
+        entry = db.get_cache_entry(*params)
         
-        # Save to database if we got results
-        if result.get('grouped') and len(result['grouped']) > 0:
-            db.save_products(
-                country_code, product_type, min_price, max_price,
-                result['grouped']
+        if is_revalidated(request, query, entry):
+            # Revalidations are repeat searches answered from cache
+            if is_new_search(options):
+                db.log_lookup(*params, entry.get('product_count', 0), cache_hit=True)
+            return finish_search_response(
+                Response(status=304), request, query, entry['cached_at'], 'revalidated', started
             )
-            result['cached'] = False
-            result['message'] = 'Fresh data scraped and cached'
         
-        return jsonify(result)
+        result = db.get_cached_products(*params, **options)
+        if result is not None:
+            timing = 'hit'
+            cached_at = datetime.fromisoformat(result['cached_at'])
+        else:
+            timing = 'miss'
+            result = _scrape_and_cache(params, options)
+            entry = db.get_cache_entry(*params)
+            cached_at = entry['cached_at'] if entry is not None else None
+        
+        return finish_search_response(jsonify(result), request, query, cached_at, timing, started)
     
     except Exception as e:
         print(f"✗ Error: {e}")
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/refresh', methods=['POST'])
+@main.route('/api/refresh', methods=['POST'])
 def force_refresh():
     """
     Force refresh products - invalidate cache and scrape fresh.
+    Accepts the same query parameters as /api/scrape.
     """
     try:
         data = request.get_json()
         
-        country_code = data.get('countryCode')
-        product_type = data.get('productType')
-        min_price = data.get('minPrice')
-        max_price = data.get('maxPrice')
-        
-        if not all([country_code, product_type, min_price, max_price]):
-            return jsonify({'error': 'All fields are required'}), 400
-        
         try:
-            min_price = int(min_price)
-            max_price = int(max_price)
-        except ValueError:
-            return jsonify({'error': 'Price must be a valid number'}), 400
+            country_code, product_type, min_price, max_price = parse_search_params(data)
+            options = parse_result_options(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Invalidate existing cache for this search
-        search_key = ProductDatabase.generate_search_key(
+        db.invalidate_search(ProductDatabase.generate_search_key(
             country_code, product_type, min_price, max_price
-        )
-        db.db.products.delete_many({"search_key": search_key})
-        db.db.search_cache.delete_one({"search_key": search_key})
+        ))
         
         # Scrape fresh data
         result = run_async(
             run_scraper(country_code, product_type, min_price, max_price)
         )
         
+        if is_new_search(options):
+            db.log_lookup(
+                country_code, product_type, min_price, max_price,
+                result.get('count', 0), cache_hit=False
+            )
+        
         # Save to database
         if result.get('grouped'):
             db.save_products(
@@ -133,6 +477,7 @@ def force_refresh():
                 result['grouped']
             )
         
+        result.update(ProductDatabase.page_products(result['grouped'], **options))
         result['cached'] = False
         result['message'] = 'Data refreshed successfully'
         
@@ -142,17 +487,23 @@ def force_refresh():
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/cache/stats', methods=['GET'])
+@main.route('/api/cache/stats', methods=['GET'])
 def cache_stats():
     """Get cache statistics."""
-    return jsonify(db.get_cache_stats())
+    stats = db.get_cache_stats()
+    stats['last_prewarm'] = last_prewarm
+    return jsonify(stats)
 
 
-@app.route('/api/cache/invalidate', methods=['POST'])
+@main.route('/api/cache/invalidate', methods=['POST'])
 def invalidate_cache():
     """
     Invalidate cache entries.
     Optionally filter by country_code and product_type.
+    
+    Invalidations larger than INVALIDATE_ASYNC_THRESHOLD entries run in
+    the background; the response (202) has a job id whose progress
+    is available from /api/cache/invalidate/<job_id>.
     """
     try:
         data = request.get_json() or {}
@@ -160,8 +511,25 @@ def invalidate_cache():
         country_code = data.get('countryCode')
         product_type = data.get('productType')
         
+        total = db.count_cache_entries(country_code, product_type)
+        
+        if total > INVALIDATE_ASYNC_THRESHOLD:
+            # Prewarm once the entries are gone; until then they still look fresh
+            job_id = db.start_invalidation(country_code, product_type, on_done=schedule_prewarm)
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': 'running',
+                'total': total,
+                'message': f'Invalidating {total} cache entries in the background'
+            }), 202
+        
         deleted_count = db.invalidate_cache(country_code, product_type)
         
+        # Rebuild popular entries in the background instead of letting
+        # users pay for the scrapes
+        schedule_prewarm()
+        
         return jsonify({
             'success': True,
             'invalidated_entries': deleted_count,
@@ -171,7 +539,128 @@ def invalidate_cache():
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/popular-searches', methods=['GET'])
+@main.route('/api/cache/invalidate/<job_id>', methods=['GET'])
+def invalidation_status(job_id):
+    """Get the progress of a background cache invalidation."""
+    job = db.get_invalidation_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@main.route('/api/products/search', methods=['GET'])
+def search_catalog():
+    """
+    Keyword search over all cached products, answered without scraping.
+    
+    Query parameters: q (required), minPrice, maxPrice, countryCode,
+    source, sort (price_asc, price_desc) and limit.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    
+    try:
+        min_price = int(request.args['minPrice']) if request.args.get('minPrice') else None
+        max_price = int(request.args['maxPrice']) if request.args.get('maxPrice') else None
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'Price and limit must be valid numbers'}), 400
+    
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        return jsonify({'error': f'Limit must be between 1 and {MAX_PAGE_LIMIT}'}), 400
+    
+    sort = request.args.get('sort', 'price_asc')
+    if sort not in SORT_ORDERS:
+        return jsonify({'error': f"Sort must be one of: {', '.join(SORT_ORDERS)}"}), 400
+    
+    products = db.search_catalog(
+        query,
+        min_price=min_price,
+        max_price=max_price,
+        country_code=request.args.get('countryCode'),
+        source=request.args.get('source'),
+        sort=sort,
+        limit=limit
+    )
+    
+    return jsonify({
+        'query': query,
+        'count': len(products),
+        'products': products
+    })
+
+
+@main.route('/api/products/suggest', methods=['GET'])
+def suggest_products():
+    """Typeahead suggestions from cached product titles."""
+    query = request.args.get('q', '')
+    
+    try:
+        limit = int(request.args.get('limit', 8))
+    except ValueError:
+        return jsonify({'error': 'Limit must be a valid number'}), 400
+    
+    if not 1 <= limit <= 20:
+        return jsonify({'error': 'Limit must be between 1 and 20'}), 400
+    
+    return jsonify(db.suggest_titles(query, limit))
+
+
+@main.route('/api/price-history', methods=['GET'])
+def price_history():
+    """
+    Price trend for one product.
+    
+    Query parameters: link (required) and days (default 30).
+    """
+    link = request.args.get('link')
+    if not link:
+        return jsonify({'error': 'Link is required'}), 400
+    
+    days = request.args.get('days', 30, type=int)
+    if not 1 <= days <= 365:
+        return jsonify({'error': 'Days must be between 1 and 365'}), 400
+    
+    trend = db.get_price_trend(link, days)
+    if trend is None:
+        return jsonify({'error': 'No price history for this product'}), 404
+    
+    return jsonify(trend)
+
+
+@main.route('/api/price-drops', methods=['GET'])
+def price_drops():
+    """
+    Biggest price drops on a day.
+    
+    Query parameters: day (YYYY-MM-DD, default today) and limit (default 10).
+    """
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({'error': 'Limit must be a valid number'}), 400
+    
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        return jsonify({'error': f'Limit must be between 1 and {MAX_PAGE_LIMIT}'}), 400
+    
+    day = None
+    if request.args.get('day'):
+        try:
+            day = datetime.strptime(request.args['day'], '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Day must be in YYYY-MM-DD format'}), 400
+    
+    return jsonify(db.get_biggest_drops(limit, day))
+
+
+@main.route('/api/browser-pool/stats', methods=['GET'])
+def browser_pool_stats():
+    """Get browser pool health and memory statistics."""
+    return jsonify(browser_pool.stats())
+
+
+@main.route('/api/popular-searches', methods=['GET'])
 def popular_searches():
     """Get popular searches."""
     limit = request.args.get('limit', 10, type=int)
@@ -193,55 +682,8 @@ def popular_searches():
 
 
 async def run_scraper(country_code: str, product_type: str, min_price: int, max_price: int):
-    """Run the scraper asynchronously."""
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        try:
-            # Results grouped by source
-            grouped_results = {}
-            
-            # Add scrapers based on country
-            if country_code == "PK":
-                # Create multiple pages for parallel scraping
-                page1 = await browser.new_page()
-                page2 = await browser.new_page()
-                page3 = await browser.new_page()
-                
-                # Run all Pakistani scrapers in parallel (Daraz, PriceOye, OLX)
-                results = await asyncio.gather(
-                    scrape_daraz(page1, product_type, min_price, max_price),
-                    scrape_priceoye(page2, product_type, min_price, max_price),
-                    return_exceptions=True
-                )
-                
-                # Close pages
-                await page1.close()
-                await page2.close()
-                await page3.close()
-                
-                # Map results to sources
-                sources = ["Daraz", "PriceOye", "OLX"]
-                for i, result in enumerate(results):
-                    source = sources[i]
-                    if isinstance(result, list) and len(result) > 0:
-                        # Sort by price within each source
-                        result.sort(key=lambda x: x.get('price', 0))
-                        grouped_results[source] = result
-                        print(f"{source}: {len(result)} products found")
-                    elif isinstance(result, Exception):
-                        print(f"{source} error: {result}")
-                    else:
-                        print(f"{source}: No products found")
-            
-            # Calculate total count
-            total_count = sum(len(products) for products in grouped_results.values())
-            
-            return {
-                "count": total_count,
-                "grouped": grouped_results
-            }
-        finally:
-            await browser.close()
+    """Run the scrapers asynchronously using this process's browser pool."""
+    return await run_scrapers(browser_pool, country_code, product_type, min_price, max_price)
 
 
 def refresh_stale_cache():
@@ -285,8 +727,140 @@ def refresh_stale_cache():
             print(f"  ✗ Failed to refresh: {e}")
 
 
+async def _prewarm_searches(searches, concurrency: int):
+    """Scrape and cache the given searches, at most `concurrency` at a time."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def prewarm_one(search):
+        async with semaphore:
+            result = await run_scraper(
+                search['country_code'], search['product_type'],
+                search['min_price'], search['max_price']
+            )
+        
+        if not result.get('grouped'):
+            return False
+        
+        # Blocking pymongo call; keep it off the event loop
+        return await asyncio.to_thread(
+            db.save_products,
+            search['country_code'], search['product_type'],
+            search['min_price'], search['max_price'],
+            result['grouped']
+        )
+    
+    return await asyncio.gather(
+        *(prewarm_one(search) for search in searches),
+        return_exceptions=True
+    )
+
+
+def prewarm_cache(
+    top_n: int = PREWARM_TOP_N,
+    budget: int = PREWARM_BUDGET,
+    concurrency: int = PREWARM_CONCURRENCY,
+    ahead_minutes: int = PREWARM_AHEAD_MINUTES
+) -> dict:
+    """
+    Proactively scrape popular searches whose cache is missing or expiring.
+    
+    Args:
+        top_n: Number of popular searches (by recent history) to consider
+        budget: Maximum number of searches to scrape in this run
+        concurrency: Number of searches scraped in parallel
+        ahead_minutes: Refresh entries expiring within this many minutes
+    
+    Returns:
+        Summary of the run
+    """
+    # Startup, interval and post-invalidation runs can overlap; only one
+    # should scrape at a time
+    if not _prewarm_lock.acquire(blocking=False):
+        print("⚠ Prewarm already running, skipping")
+        return {'skipped': True}
+    
+    try:
+        return _prewarm_cache(top_n, budget, concurrency, ahead_minutes)
+    finally:
+        _prewarm_lock.release()
+
+
+def _prewarm_cache(top_n: int, budget: int, concurrency: int, ahead_minutes: int) -> dict:
+    """Run one prewarm pass (see prewarm_cache)."""
+    global last_prewarm
+    
+    if not db.is_connected():
+        print("⚠ Database not connected, skipping cache prewarm")
+        return {'connected': False}
+    
+    started = datetime.utcnow()
+    candidates = db.get_prewarm_candidates(
+        top_n,
+        expiring_within=timedelta(minutes=ahead_minutes),
+        since=started - timedelta(days=PREWARM_HISTORY_DAYS)
+    )
+    selected = candidates[:max(0, budget)]
+    
+    if selected:
+        print(f"→ Prewarming {len(selected)} of {len(candidates)} popular searches...")
+        results = run_async(_prewarm_searches(selected, concurrency))
+    else:
+        results = []
+    
+    failed = 0
+    for search, result in zip(selected, results):
+        if result is not True:
+            failed += 1
+            reason = result if isinstance(result, Exception) else 'no products'
+            print(f"  ✗ Failed to prewarm {search['product_type']}: {reason}")
+            db.record_prewarm_failure(search['search_key'])
+    
+    last_prewarm = {
+        'started_at': started.isoformat(),
+        'duration_seconds': round((datetime.utcnow() - started).total_seconds(), 2),
+        'candidates': len(candidates),
+        'prewarmed': len(selected) - failed,
+        'failed': failed,
+        'skipped_over_budget': len(candidates) - len(selected)
+    }
+    print(f"✓ Prewarm finished: {last_prewarm['prewarmed']} searches warmed")
+    return last_prewarm
+
+
+def schedule_prewarm():
+    """Run a prewarm as soon as possible on the background scheduler, if running."""
+    if scheduler is None or not scheduler.running:
+        return
+    
+    scheduler.add_job(
+        func=prewarm_cache,
+        id='prewarm_now',
+        replace_existing=True
+    )
+
+
+@main.cli.command('prewarm')
+def prewarm_command():
+    """Prewarm the cache from popular searches (e.g. at deploy time)."""
+    summary = prewarm_cache()
+    print(summary)
+
+
+@main.cli.command('rebuild-catalog')
+def rebuild_catalog_command():
+    """Index all cached products into the cross-search catalog."""
+    processed = db.rebuild_catalog()
+    print(f"✓ Indexed {processed} cached products")
+
+
 def start_scheduler():
     """Start the background scheduler for cache refresh."""
+    global scheduler
+    
+    if scheduler is None:
+        from apscheduler.schedulers.background import BackgroundScheduler
+        scheduler = BackgroundScheduler()
+    
     if not scheduler.running:
         # Refresh stale cache every 30 minutes
         scheduler.add_job(
@@ -296,16 +870,56 @@ def start_scheduler():
             id='refresh_stale_cache',
             replace_existing=True
         )
+        # Refresh popular searches shortly before their cache expires.
+        # Run at least twice per lookahead window so nothing slips through.
+        scheduler.add_job(
+            func=prewarm_cache,
+            trigger='interval',
+            minutes=max(1, PREWARM_AHEAD_MINUTES // 2),
+            id='prewarm_expiring',
+            replace_existing=True
+        )
         scheduler.start()
+        
+        if PREWARM_ON_STARTUP:
+            schedule_prewarm()
         print("✓ Background scheduler started")
         
         # Shut down scheduler when app exits
         atexit.register(lambda: scheduler.shutdown())
 
 
-# Start scheduler when app loads
-start_scheduler()
+def create_app(enable_scheduler: bool = False) -> Flask:
+    """
+    Create and configure the Flask application.
+    
+    Creating the app is side-effect free unless asked to start the
+    scheduler: MongoDB connects on the first request and Playwright is
+    imported on the first scrape.
+    
+    Args:
+        enable_scheduler: Start the background refresh scheduler. Entry
+                          points (wsgi.py, asgi.py, `python app.py`) decide
+                          this, so importing this module never starts it.
+    """
+    app = Flask(__name__)
+    
+    # gzip/brotli for JSON and static assets, for clients that accept it
+    app.config.setdefault('COMPRESS_ALGORITHM', COMPRESS_ALGORITHMS)
+    app.config.setdefault('COMPRESS_MIMETYPES', [
+        'application/json', 'text/html', 'text/css', 'application/javascript'
+    ])
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    Compress(app)
+    
+    app.register_blueprint(main)
+    
+    if enable_scheduler:
+        start_scheduler()
+    
+    return app
 
 
 if __name__ == '__main__':
+    app = create_app(enable_scheduler=True)
     app.run(debug=True, use_reloader=False, port=5000)
@@ -0,0 +1,198 @@
+"""
+ASGI entry point: async serving mode
+
+`/api/scrape` and `/api/search` are served by an async Quart app in which
+request handling, cache reads (AsyncProductDatabase) and the scrapers all
+share one event loop, so a waiting request holds no thread. Every other
+route is served by the Flask app from app.py, in a pool of worker threads.
+
+The browser pool from app.py runs on the serving event loop, so Flask
+routes and scheduler jobs scrape with the same browsers.
+
+Run with a single event loop per worker, e.g.:
+    hypercorn asgi:app --bind 0.0.0.0:8000
+"""
+
+from quart import Quart, Response, request, jsonify, redirect
+from a2wsgi import WSGIMiddleware
+import asyncio
+import gzip
+import os
+import time
+from datetime import datetime
+
+import brotli
+
+from app import (
+    create_app, start_scheduler, use_scraper_loop, run_scraper, browser_pool,
+    parse_search_params, parse_result_options, canonical_search_query,
+    is_new_search, is_revalidated, finish_search_response, scraped_result,
+    response_encoding, ENABLE_SCHEDULER
+)
+from async_database import adb
+from database import db
+
+# Paths handled by the async app; everything else goes to Flask
+ASYNC_PATHS = {'/api/scrape', '/api/search'}
+
+# Threads serving the Flask routes; a blocking request (e.g. /api/refresh)
+# holds only one of them
+WSGI_THREADS = int(os.environ.get("WSGI_THREADS", 16))
+
+# Smallest JSON body worth compressing (as COMPRESS_MIN_SIZE in app.py)
+COMPRESS_MIN_SIZE = 500
+
+async_app = Quart(__name__)
+
+
+@async_app.before_serving
+async def startup():
+    """Scrape on this event loop and create indexes once, off the loop."""
+    # Registered before anything can scrape: importing app.py doesn't start
+    # the scheduler, and Flask routes are only served from here on
+    use_scraper_loop(asyncio.get_running_loop())
+    await asyncio.to_thread(db.is_connected)
+    
+    # Started only once this loop is registered, so its jobs scrape on it
+    if ENABLE_SCHEDULER:
+        start_scheduler()
+
+
+@async_app.after_serving
+async def shutdown():
+    """Close pooled browsers and MongoDB connections."""
+    await browser_pool.shutdown()
+    await adb.close()
+
+
+@async_app.after_request
+async def compress(response):
+    """Compress JSON responses with brotli or gzip, as Flask-Compress does in app.py."""
+    response.vary.add('Accept-Encoding')
+    encoding = response_encoding(request)
+    
+    if (
+        encoding is None
+        or response.status_code != 200
+        or response.mimetype != 'application/json'
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+    
+    body = await response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=5))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=6))
+    response.headers['Content-Encoding'] = encoding
+    
+    # Same validator as Flask-Compress: W/"abc" => W/"abc:gzip"
+    etag = response.headers.get('ETag')
+    if etag:
+        response.headers['ETag'] = f'{etag[:-1]}:{encoding}"'
+    return response
+
+
+async def scrape_and_cache(params: tuple, options: dict) -> dict:
+    """Scrape fresh data on this event loop, cache it and return the requested page."""
+    country_code, product_type, min_price, max_price = params
+    
+    print(f"→ Scraping fresh data for: {product_type}")
+    result = await run_scraper(country_code, product_type, min_price, max_price)
+    
+    # Misses count as cold lookups even when the scrape found nothing
+    if is_new_search(options):
+        await adb.log_lookup(*params, result.get('count', 0), cache_hit=False)
+    
+    # Save to database if we got results
+    if result.get('grouped'):
+        await adb.save_products(
+            country_code, product_type, min_price, max_price,
+            result['grouped']
+        )
+    
+    return scraped_result(result, options)
+
+
+@async_app.route('/api/scrape', methods=['POST'])
+async def scrape_products():
+    """Async version of app.scrape_products (same request and response)."""
+    try:
+        data = await request.get_json()
+        
+        # Validate input
+        try:
+            params = parse_search_params(data)
+            options = parse_result_options(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Try to get from cache first (unless force refresh requested)
+        if not data.get('forceRefresh', False):
+            cached_result = await adb.get_cached_products(*params, **options)
+            if cached_result is not None:
+                return jsonify(cached_result)
+        
+        # Cache miss or force refresh - scrape fresh data
+        return jsonify(await scrape_and_cache(params, options))
+    
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@async_app.route('/api/search', methods=['GET'])
+async def search_products():
+    """Async version of app.search_products (same request and response)."""
+    started = time.perf_counter()
+    
+    try:
+        params = parse_search_params(request.args)
+        options = parse_result_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = canonical_search_query(params, options)
+    if request.query_string.decode() != query:
+        return redirect(f"{request.path}?{query}", code=301)
+    
+    try:
+        entry = await adb.get_cache_entry(*params)
+        
+        if is_revalidated(request, query, entry):
+            if is_new_search(options):
+                await adb.log_lookup(*params, entry.get('product_count', 0), cache_hit=True)
+            return finish_search_response(
+                Response('', status=304), request, query, entry['cached_at'], 'revalidated', started
+            )
+        
+        result = await adb.get_cached_products(*params, **options)
+        if result is not None:
+            timing = 'hit'
+            cached_at = datetime.fromisoformat(result['cached_at'])
+        else:
+            timing = 'miss'
+            result = await scrape_and_cache(params, options)
+            entry = await adb.get_cache_entry(*params)
+            cached_at = entry['cached_at'] if entry is not None else None
+        
+        return finish_search_response(jsonify(result), request, query, cached_at, timing, started)
+    
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+# All other routes, run by the Flask app in a thread pool
+flask_app = WSGIMiddleware(create_app(), workers=WSGI_THREADS)
+
+
+async def app(scope, receive, send):
+    """Route async paths (and server lifespan events) to Quart, the rest to Flask."""
+    if scope['type'] == 'lifespan' or scope.get('path') in ASYNC_PATHS:
+        await async_app(scope, receive, send)
+    else:
+        await flask_app(scope, receive, send)
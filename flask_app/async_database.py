@@ -0,0 +1,163 @@
+"""
+Async MongoDB access for the ASGI app (asgi.py)
+
+Cache reads run on the serving event loop through PyMongo's native async
+client, so waiting on MongoDB does not hold a thread. They use the same
+query and result-building steps as ProductDatabase. Writes (products,
+catalog, price history) go through the synchronous ProductDatabase in a
+worker thread, so there is a single implementation of the write path;
+they only happen after a scrape, which dominates their cost.
+"""
+
+from pymongo import AsyncMongoClient
+from pymongo.errors import PyMongoError
+from typing import List, Dict, Optional
+import asyncio
+import os
+
+from database import db, ProductDatabase, MONGO_URI, DB_NAME
+
+# Connections kept by the async client's pool
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", 100))
+
+
+class AsyncProductDatabase:
+    """Async MongoDB handler for cache reads."""
+    
+    def __init__(self):
+        self.client = None
+        self.db = None
+    
+    def _ensure_client(self):
+        """Create the client on first use; it connects in the background."""
+        if self.client is None:
+            self.client = AsyncMongoClient(
+                MONGO_URI,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                serverSelectionTimeoutMS=5000,
+                connectTimeoutMS=5000
+            )
+            self.db = self.client[DB_NAME]
+    
+    async def close(self):
+        """Close the client and its connection pool."""
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+            self.db = None
+    
+    async def get_cache_entry(
+        self,
+        country_code: str,
+        product_type: str,
+        min_price: int,
+        max_price: int
+    ) -> Optional[Dict]:
+        """Get the search cache entry (not its products) if it is fresh."""
+        self._ensure_client()
+        search_key = ProductDatabase.generate_search_key(country_code, product_type, min_price, max_price)
+        
+        try:
+            cache_entry = await self.db.search_cache.find_one(
+                {"search_key": search_key},
+                {"_id": 0, "search_key": 1, "cached_at": 1, "product_count": 1}
+            )
+        except PyMongoError as e:
+            print(f"✗ MongoDB read failed: {e}")
+            return None
+        
+        return cache_entry if ProductDatabase.is_fresh(cache_entry) else None
+    
+    async def get_cached_products(
+        self,
+        country_code: str,
+        product_type: str,
+        min_price: int,
+        max_price: int,
+        page: int = 1,
+        limit: int = None,
+        sort: str = "price_asc",
+        fields: List[str] = None,
+        source: str = None
+    ) -> Optional[Dict]:
+        """
+        Get cached products if they exist and are fresh.
+        
+        Same arguments and result as ProductDatabase.get_cached_products().
+        """
+        self._ensure_client()
+        search_key = ProductDatabase.generate_search_key(country_code, product_type, min_price, max_price)
+        
+        try:
+            result = await self._read_cache(search_key, page, limit, sort, fields, source)
+        except PyMongoError as e:
+            print(f"✗ MongoDB read failed: {e}")
+            return None
+        
+        # Fetching further pages is not a new search
+        if result is not None and page == 1 and source is None:
+            await self.log_lookup(country_code, product_type, min_price, max_price, result["count"], cache_hit=True)
+        
+        return result
+    
+    async def _read_cache(
+        self,
+        search_key: str,
+        page: int,
+        limit: Optional[int],
+        sort: str,
+        fields: Optional[List[str]],
+        source: Optional[str]
+    ) -> Optional[Dict]:
+        """Read a page of a fresh cache entry, or None (see ProductDatabase._read_cache)."""
+        cache_entry = await self.db.search_cache.find_one({"search_key": search_key})
+        if not ProductDatabase.is_fresh(cache_entry):
+            return None
+        
+        source_counts = cache_entry.get("source_counts")
+        if source_counts is None:
+            cursor = await self.db.products.aggregate(ProductDatabase.source_count_pipeline(search_key))
+            source_counts = ProductDatabase.source_counts(await cursor.to_list(None))
+        
+        source_counts = ProductDatabase.page_sources(source_counts, source)
+        if source_counts is None:
+            return None
+        
+        # Read every source's page concurrently
+        sources = list(source_counts)
+        pages = await asyncio.gather(*(
+            ProductDatabase.page_cursor(self.db, search_key, src, page, limit, sort, fields).to_list(None)
+            for src in sources
+        ))
+        grouped = dict(zip(sources, pages))
+        
+        return ProductDatabase.cached_result(grouped, source_counts, page, limit, sort, cache_entry)
+    
+    async def log_lookup(
+        self,
+        country_code: str,
+        product_type: str,
+        min_price: int,
+        max_price: int,
+        results_count: int,
+        cache_hit: bool
+    ):
+        """Record a user search (see ProductDatabase.log_lookup)."""
+        self._ensure_client()
+        search_key = ProductDatabase.generate_search_key(country_code, product_type, min_price, max_price)
+        
+        try:
+            await self.db.search_history.insert_one(ProductDatabase.search_history_entry(
+                search_key, country_code, product_type, min_price, max_price,
+                results_count, cache_hit=cache_hit
+            ))
+        except PyMongoError as e:
+            print(f"✗ Failed to log search: {e}")
+    
+    async def save_products(self, *args, **kwargs) -> bool:
+        """Save scraped products (see ProductDatabase.save_products)."""
+        return await asyncio.to_thread(db.save_products, *args, **kwargs)
+
+
+# Global async database instance (connects lazily on first use)
+adb = AsyncProductDatabase()
@@ -0,0 +1,105 @@
+"""
+Benchmark for the price history store.
+
+Simulates repeated scrapes of a product catalog with random price changes,
+then reports storage growth and query latency. Runs against a separate
+database (BENCH_DB_NAME, default "product_search_bench"), which is dropped
+first; its name must end in "_bench". MONGO_DB_NAME is ignored.
+
+Usage:
+    python bench_price_history.py --products 50000 --scrapes 60 --change-rate 0.35
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+BENCH_DB_NAME = os.environ.get("BENCH_DB_NAME", "product_search_bench")
+if not BENCH_DB_NAME.endswith("_bench"):
+    raise SystemExit(f"Refusing to drop {BENCH_DB_NAME!r}: BENCH_DB_NAME must end in '_bench'")
+
+# The app's database name is replaced, never reused, since it is dropped
+os.environ["MONGO_DB_NAME"] = BENCH_DB_NAME
+
+from database import db, DB_NAME  # noqa: E402  (reads MONGO_DB_NAME on import)
+
+
+def timed(func, runs: int) -> float:
+    """Median wall time of `func` in milliseconds."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--scrapes", type=int, default=60, help="Scrapes per product, one every 12 hours")
+    parser.add_argument("--change-rate", type=float, default=0.35, help="Chance a price changes between scrapes")
+    parser.add_argument("--batch", type=int, default=40, help="Products per scrape (as returned by a scraper)")
+    args = parser.parse_args()
+    
+    if not db.is_connected():
+        raise SystemExit("MongoDB is not reachable")
+    
+    assert DB_NAME == BENCH_DB_NAME
+    db.client.drop_database(DB_NAME)
+    db._indexes_created = False
+    db._create_indexes()
+    # Scrapes are backdated up to `scrapes` * 12 hours; without this the TTL
+    # monitor would expire catalog entries mid-run and their next scrape
+    # would be recorded as a first sighting
+    db.db.catalog.drop_index([("last_seen", 1)])
+    
+    random.seed(1)
+    prices = [random.randint(5000, 400000) for _ in range(args.products)]
+    start = datetime.utcnow() - timedelta(hours=12 * args.scrapes)
+    
+    print(f"Writing {args.scrapes} scrapes of {args.products} products...")
+    started = time.perf_counter()
+    for scrape in range(args.scrapes):
+        seen_at = start + timedelta(hours=12 * scrape)
+        for offset in range(0, args.products, args.batch):
+            batch = []
+            for i in range(offset, min(offset + args.batch, args.products)):
+                if scrape and random.random() < args.change_rate:
+                    prices[i] = max(1000, int(prices[i] * random.uniform(0.85, 1.1)))
+                batch.append({
+                    "title": f"Bench Phone {i} 128GB",
+                    "price": prices[i],
+                    "link": f"https://example.com/products/{i}",
+                    "source": "Bench",
+                    "currency": "PKR"
+                })
+            db._update_catalog(batch, "PK", "phone", seen_at)
+    write_seconds = time.perf_counter() - started
+    
+    history = db.db.price_history
+    observations = next(history.aggregate([
+        {"$group": {"_id": None, "n": {"$sum": "$count"}}}
+    ]), {"n": 0})["n"]
+    stats = db.db.command("collStats", "price_history")
+    
+    link = "https://example.com/products/123"
+    trend_ms = timed(lambda: db.get_price_trend(link, 30), 50)
+    drops_ms = timed(lambda: db.get_biggest_drops(10, start + timedelta(hours=12 * (args.scrapes - 1))), 50)
+    
+    print(f"Observations:        {observations:,}")
+    print(f"Bucket documents:    {stats['count']:,}")
+    print(f"Data size:           {stats['size'] / 1024 / 1024:.1f} MB")
+    print(f"Storage size:        {stats['storageSize'] / 1024 / 1024:.1f} MB")
+    print(f"Index size:          {stats['totalIndexSize'] / 1024 / 1024:.1f} MB")
+    print(f"Bytes/observation:   {stats['storageSize'] / max(observations, 1):.1f}")
+    print(f"Write throughput:    {args.products * args.scrapes / write_seconds:,.0f} products/s")
+    print(f"30-day trend query:  {trend_ms:.2f} ms (median)")
+    print(f"Biggest drops query: {drops_ms:.2f} ms (median)")
+
+
+if __name__ == "__main__":
+    main()
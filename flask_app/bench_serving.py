@@ -0,0 +1,79 @@
+"""
+Benchmark for the serving stack.
+
+Sends concurrent search requests to a running server and reports
+throughput and latency, for cache hits and for cache misses. Run it once
+against the threaded Flask deployment and once against the ASGI app:
+
+    gunicorn -w 1 --threads 16 -b :5000 wsgi:app
+    hypercorn -w 1 -b :8000 asgi:app
+
+    python bench_serving.py --url http://localhost:5000
+    python bench_serving.py --url http://localhost:8000
+
+Misses scrape live sites, so keep --miss-requests small.
+"""
+
+import argparse
+import json
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def post_search(url: str, min_price: int, max_price: int) -> float:
+    """POST one search and return its latency in milliseconds."""
+    body = json.dumps({
+        "countryCode": "PK",
+        "productType": "phone",
+        "minPrice": min_price,
+        "maxPrice": max_price
+    }).encode()
+    req = urllib.request.Request(
+        f"{url}/api/scrape?limit=20",
+        data=body,
+        headers={"Content-Type": "application/json"}
+    )
+    
+    started = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=300) as response:
+        response.read()
+    return (time.perf_counter() - started) * 1000
+
+
+def run(label: str, url: str, ranges: list, concurrency: int):
+    """Send one request per price range with `concurrency` in flight."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda r: post_search(url, *r), ranges))
+    elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    print(
+        f"{label:<6} {len(ranges):>6} requests  {len(ranges) / elapsed:>8.1f} req/s  "
+        f"p50 {statistics.median(latencies):>8.1f} ms  p95 {p95:>8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--hit-requests", type=int, default=2000)
+    parser.add_argument("--miss-requests", type=int, default=8)
+    args = parser.parse_args()
+    
+    # Warm one search so every hit request is served from cache
+    post_search(args.url, 10000, 50000)
+    run("hit", args.url, [(10000, 50000)] * args.hit_requests, args.concurrency)
+    
+    # Unique price ranges are never cached
+    base = int(time.time()) % 100000
+    misses = [(base + i, base + i + 100000) for i in range(args.miss_requests)]
+    run("miss", args.url, misses, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,398 @@
 import asyncio
-from playwright.async_api import async_playwright
+import os
+import time
+from contextlib import asynccontextmanager
+
+import psutil
+
+
+# Pool configuration (see BrowserPool.from_env)
+BROWSER_POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", 4))
+BROWSER_MAX_PAGES = int(os.environ.get("BROWSER_MAX_PAGES", 100))  # Pages before a browser is recycled
+BROWSER_MAX_RSS_MB = int(os.environ.get("BROWSER_MAX_RSS_MB", 1024))  # Per browser, 0 to disable
+BROWSER_MAX_TOTAL_RSS_MB = int(os.environ.get("BROWSER_MAX_TOTAL_RSS_MB", 3072))  # Per process, 0 to disable
+BROWSER_MEMORY_CHECK_SECONDS = int(os.environ.get("BROWSER_MEMORY_CHECK_SECONDS", 30))  # Memory sampling interval
+
+# Process names used by Playwright's Chromium builds
+CHROMIUM_PROCESS_NAMES = ("chrome", "chromium", "headless_shell")
+
+
+def _is_chromium(proc) -> bool:
+    try:
+        name = proc.name().lower()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+    return any(n in name for n in CHROMIUM_PROCESS_NAMES)
+
+
+def _tree_rss(proc) -> int:
+    """Resident memory (bytes) of a process and all its children."""
+    try:
+        procs = [proc] + proc.children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return 0
+    
+    total = 0
+    for p in procs:
+        try:
+            total += p.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return total
 
 
 class BrowserPool:
-    """A pool of browser instances for concurrent scraping."""
+    """
+    A pool of browser instances for concurrent scraping.
     
-    def __init__(self, size=2):
+    Each browser is handed out exclusively. On release it is checked by a
+    watchdog and replaced if it has crashed or disconnected, has served
+    `max_pages` pages, or is using more than `max_browser_rss_mb` of memory.
+    While the whole pool is above `max_total_rss_mb`, the browser using the
+    most memory is retired.
+    
+    Memory is sampled in a worker thread at most every
+    `memory_check_seconds`, so releases never wait on it; browsers found over
+    a limit are retired on their next release, or acquire if idle.
+    """
+    
+    def __init__(
+        self,
+        size=2,
+        max_pages=100,
+        max_browser_rss_mb=None,
+        max_total_rss_mb=None,
+        memory_check_seconds=30
+    ):
         self.size = size
+        self.max_pages = max_pages
+        self.max_browser_rss_mb = max_browser_rss_mb
+        self.max_total_rss_mb = max_total_rss_mb
+        self.memory_check_seconds = memory_check_seconds
         self._queue = asyncio.Queue(maxsize=size)
+        self._start_lock = asyncio.Lock()
+        self._launch_lock = asyncio.Lock()
         self.playwright = None
-
+        self._started = False
+        
+        # Per-browser state, keyed by browser object
+        self._pages = {}           # pages served, for every live browser (idle or in use)
+        self._crashed = set()      # browsers with a crashed page
+        self._pids = {}            # root Chromium process id, when known
+        self._over_memory = set()  # browsers to retire for memory use
+        
+        # Browsers that failed to relaunch and must be replaced on acquire
+        self._missing = 0
+        
+        # Last memory sample (bytes)
+        self._rss = {}
+        self._total_rss = 0
+        self._memory_checked_at = 0.0
+        self._memory_check = None
+        
+        self._metrics = {
+            "launched": 0,
+            "launch_failures": 0,
+            "pages_served": 0,
+            "page_crashes": 0,
+            "stray_contexts_closed": 0,
+            "retired": {
+                "page_limit": 0,
+                "memory": 0,
+                "crashed": 0,
+                "disconnected": 0,
+            },
+        }
+    
+    @classmethod
+    def from_env(cls):
+        """Create a pool configured from the BROWSER_* environment variables."""
+        return cls(
+            size=BROWSER_POOL_SIZE,
+            max_pages=BROWSER_MAX_PAGES,
+            max_browser_rss_mb=BROWSER_MAX_RSS_MB or None,
+            max_total_rss_mb=BROWSER_MAX_TOTAL_RSS_MB or None,
+            memory_check_seconds=BROWSER_MEMORY_CHECK_SECONDS
+        )
+    
     async def start(self):
         """Start the browser pool and launch browser instances."""
+        from playwright.async_api import async_playwright
+        
         self.playwright = await async_playwright().start()
-        for _ in range(self.size):
-            browser = await self.playwright.chromium.launch(headless=True)
-            await self._queue.put(browser)
-
+        try:
+            for _ in range(self.size):
+                browser = await self._launch()
+                await self._queue.put(browser)
+        except Exception:
+            await self.shutdown()
+            raise
+        self._started = True
+    
+    async def _ensure_started(self):
+        """Start the pool on first use."""
+        if self._started:
+            return
+        async with self._start_lock:
+            if not self._started:
+                await self.start()
+    
+    def _chromium_roots(self) -> set:
+        """Pids of top-level Chromium processes started by this process."""
+        roots = set()
+        for proc in psutil.Process().children(recursive=True):
+            if not _is_chromium(proc):
+                continue
+            try:
+                parent = proc.parent()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            if parent is None or not _is_chromium(parent):
+                roots.add(proc.pid)
+        return roots
+    
+    async def _launch(self):
+        """Launch a browser and start tracking it."""
+        # Launches are serialized so the new Chromium process can be told
+        # apart from the others, which lets memory be measured per browser
+        async with self._launch_lock:
+            before = await asyncio.to_thread(self._chromium_roots)
+            try:
+                browser = await self.playwright.chromium.launch(headless=True)
+            except Exception:
+                self._metrics["launch_failures"] += 1
+                raise
+            new_roots = await asyncio.to_thread(self._chromium_roots) - before
+        
+        self._metrics["launched"] += 1
+        self._pages[browser] = 0
+        if len(new_roots) == 1:
+            self._pids[browser] = new_roots.pop()
+        return browser
+    
+    async def _retire(self, browser, reason: str):
+        """Close a browser and stop tracking it."""
+        self._metrics["retired"][reason] += 1
+        self._pages.pop(browser, None)
+        self._pids.pop(browser, None)
+        self._rss.pop(browser, None)
+        self._crashed.discard(browser)
+        self._over_memory.discard(browser)
+        try:
+            await browser.close()
+        except Exception:
+            pass  # Already dead
+    
+    async def _replace(self, browser, reason: str):
+        """Retire a browser and launch a fresh one in its place."""
+        print(f"Browser pool: retiring browser ({reason})")
+        await self._retire(browser, reason)
+        try:
+            return await self._launch()
+        except Exception as e:
+            print(f"Browser pool: failed to launch replacement - {e}")
+            self._missing += 1
+            return None
+    
+    def browser_rss(self, browser) -> int:
+        """Resident memory (bytes) of a browser's process tree, 0 if unknown."""
+        pid = self._pids.get(browser)
+        if pid is None:
+            return 0
+        try:
+            return _tree_rss(psutil.Process(pid))
+        except psutil.NoSuchProcess:
+            return 0
+    
+    def total_rss(self) -> int:
+        """Resident memory (bytes) of all Chromium processes owned by this process."""
+        total = 0
+        for pid in self._chromium_roots():
+            try:
+                total += _tree_rss(psutil.Process(pid))
+            except psutil.NoSuchProcess:
+                pass
+        return total
+    
+    def _sample_memory(self, pids: dict):
+        """Per-browser and total resident memory (bytes); blocking, run in a thread."""
+        rss = {}
+        for browser, pid in pids.items():
+            try:
+                rss[browser] = _tree_rss(psutil.Process(pid))
+            except psutil.NoSuchProcess:
+                rss[browser] = 0
+        return rss, self.total_rss()
+    
+    async def _check_memory(self):
+        """Sample memory and flag the browsers to retire for it."""
+        try:
+            rss, total = await asyncio.to_thread(self._sample_memory, dict(self._pids))
+        except Exception as e:
+            print(f"Browser pool: memory check failed - {e}")
+            return
+        
+        # Ignore browsers retired while sampling
+        rss = {browser: size for browser, size in rss.items() if browser in self._pages}
+        self._rss = rss
+        self._total_rss = total
+        
+        over = set()
+        if self.max_browser_rss_mb:
+            limit = self.max_browser_rss_mb * 1024 * 1024
+            over.update(browser for browser, size in rss.items() if size > limit)
+        
+        # Over the pool limit: retire the largest browser, then re-check
+        if self.max_total_rss_mb and total > self.max_total_rss_mb * 1024 * 1024 and not over:
+            if rss:
+                over.add(max(rss, key=rss.get))
+        
+        self._over_memory = over
+    
+    def _schedule_memory_check(self):
+        """Start a memory check in the background if one is due."""
+        if not (self.max_browser_rss_mb or self.max_total_rss_mb):
+            return
+        if self._memory_check is not None and not self._memory_check.done():
+            return
+        now = time.monotonic()
+        if now - self._memory_checked_at < self.memory_check_seconds:
+            return
+        
+        self._memory_checked_at = now
+        self._memory_check = asyncio.create_task(self._check_memory())
+    
+    def _retire_reason(self, browser):
+        """Why a browser should be retired, or None if it is healthy."""
+        if not browser.is_connected():
+            return "disconnected"
+        if browser in self._crashed:
+            return "crashed"
+        if self.max_pages and self._pages.get(browser, 0) >= self.max_pages:
+            return "page_limit"
+        if browser in self._over_memory:
+            return "memory"
+        return None
+    
     async def acquire(self):
         """Acquire a browser from the pool."""
-        return await self._queue.get()
-
+        await self._ensure_started()
+        
+        # Fill slots left empty by failed relaunches
+        if self._queue.empty() and self._missing > 0:
+            self._missing -= 1
+            try:
+                return await self._launch()
+            except Exception:
+                self._missing += 1
+                raise
+        
+        browser = await self._queue.get()
+        
+        # Replace browsers that died, or went over a memory limit, while idle
+        reason = self._retire_reason(browser)
+        if reason:
+            browser = await self._replace(browser, reason)
+            if browser is None:
+                return await self.acquire()
+        return browser
+    
     async def release(self, browser):
         """Release a browser back to the pool."""
+        # Already closed by shutdown()
+        if browser not in self._pages:
+            return
+        
+        # Close contexts (and their pages) left open by the caller
+        for context in list(browser.contexts):
+            self._metrics["stray_contexts_closed"] += 1
+            try:
+                await context.close()
+            except Exception:
+                pass
+        
+        reason = self._retire_reason(browser)
+        if reason:
+            browser = await self._replace(browser, reason)
+            if browser is None:
+                return
         await self._queue.put(browser)
-
+        self._schedule_memory_check()
+    
+    @asynccontextmanager
+    async def page(self):
+        """
+        Open a page in its own browser context.
+        
+        The context is closed and the browser returned to the pool on exit.
+        """
+        browser = await self.acquire()
+        context = None
+        try:
+            context = await browser.new_context()
+            page = await context.new_page()
+            page.on("crash", lambda _: self._on_crash(browser))
+            self._pages[browser] = self._pages.get(browser, 0) + 1
+            self._metrics["pages_served"] += 1
+            yield page
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            await self.release(browser)
+    
+    def _on_crash(self, browser):
+        self._metrics["page_crashes"] += 1
+        self._crashed.add(browser)
+    
+    def stats(self) -> dict:
+        """Pool health and metrics; memory is from the last sample."""
+        return {
+            "started": self._started,
+            "size": self.size,
+            "available": self._queue.qsize(),
+            "missing": self._missing,
+            "max_pages": self.max_pages,
+            "max_browser_rss_mb": self.max_browser_rss_mb,
+            "max_total_rss_mb": self.max_total_rss_mb,
+            "total_rss_mb": round(self._total_rss / (1024 * 1024), 1),
+            "browsers": [
+                {
+                    "pages_served": pages,
+                    "rss_mb": round(self._rss.get(browser, 0) / (1024 * 1024), 1),
+                }
+                for browser, pages in list(self._pages.items())
+            ],
+            **self._metrics,
+        }
+    
     async def shutdown(self):
-        """Shutdown all browsers and stop playwright."""
+        """Close every browser (idle or in use), stop playwright and reset the pool."""
+        if self._memory_check is not None:
+            self._memory_check.cancel()
+            self._memory_check = None
+        
+        browsers = list(self._pages)
         while not self._queue.empty():
-            browser = await self._queue.get()
-            await browser.close()
+            self._queue.get_nowait()
+        
+        self._pages.clear()
+        self._pids.clear()
+        self._crashed.clear()
+        self._over_memory.clear()
+        self._rss = {}
+        self._total_rss = 0
+        self._memory_checked_at = 0.0
+        self._missing = 0
+        
+        for browser in browsers:
+            try:
+                await browser.close()
+            except Exception:
+                pass  # Already dead
         if self.playwright:
             await self.playwright.stop()
+            self.playwright = None
+        self._started = False
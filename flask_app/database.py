@@ -6,20 +6,78 @@ This module handles:
 - Product CRUD operations
 - Cache management with TTL (Time To Live)
 - Search history tracking
+- Cross-search product catalog for keyword queries
+- Price history (daily buckets of price changes per product)
 """
 
-from pymongo import MongoClient, ASCENDING, DESCENDING
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import (
+    BulkWriteError, ConnectionFailure, OperationFailure, PyMongoError, ServerSelectionTimeoutError
+)
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
 import hashlib
 import os
+import re
+import threading
+import unicodedata
+import uuid
 
 # Configuration
 MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
 DB_NAME = os.environ.get("MONGO_DB_NAME", "product_search")
 CACHE_TTL_HOURS = int(os.environ.get("CACHE_TTL_HOURS", 1))  # Data freshness in hours
 
+# Product fields that clients may select; internal fields are never returned
+PRODUCT_FIELDS = ("title", "price", "image", "link", "source", "currency")
+
+# Supported result orderings (by price)
+SORT_ORDERS = {"price_asc": ASCENDING, "price_desc": DESCENDING}
+
+# Catalog entries not seen in any scrape for this long are removed
+CATALOG_TTL_DAYS = int(os.environ.get("CATALOG_TTL_DAYS", 7))
+
+# Price history buckets older than this are removed
+PRICE_HISTORY_RETENTION_DAYS = int(os.environ.get("PRICE_HISTORY_RETENTION_DAYS", 365))
+
+# Search history older than this is removed
+SEARCH_HISTORY_RETENTION_DAYS = int(os.environ.get("SEARCH_HISTORY_RETENTION_DAYS", 30))
+
+# Window of search history used for the warm (cache hit) ratio
+LOOKUP_STATS_HOURS = int(os.environ.get("LOOKUP_STATS_HOURS", 24))
+
+# A search whose prewarm found nothing is retried after this long, doubling
+# on each further failure up to PREWARM_RETRY_MAX_HOURS
+PREWARM_RETRY_MINUTES = int(os.environ.get("PREWARM_RETRY_MINUTES", 30))
+PREWARM_RETRY_MAX_HOURS = 24
+
+# Cache entries deleted per batch during invalidation
+INVALIDATE_BATCH_SIZE = int(os.environ.get("INVALIDATE_BATCH_SIZE", 500))
+
+
+def normalize_title(title: str) -> str:
+    """Lower-case a title and reduce it to plain words and numbers."""
+    text = unicodedata.normalize("NFKD", title or "")
+    text = text.encode("ascii", "ignore").decode().lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def title_tokens(title: str) -> List[str]:
+    """Unique search tokens of a title, in order."""
+    return list(dict.fromkeys(normalize_title(title).split()))
+
+
+def normalize_link(link: str) -> str:
+    """
+    Canonical form of a product link, used to deduplicate listings.
+    
+    Query strings and fragments (search and tracking parameters) are dropped.
+    """
+    parts = urlsplit(link.strip())
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, "", ""))
+
 
 class ProductDatabase:
     """MongoDB database handler for product caching."""
@@ -39,49 +97,166 @@ class ProductDatabase:
         
         self.client = None
         self.db = None
+        self._connect_attempted = False
+        self._connect_lock = threading.Lock()
+        self._indexes_created = False
         self._initialized = True
-        self._connect()
+    
+    def _ensure_connection(self):
+        """
+        Connect on first use instead of at import time.
+        
+        If the server can't be reached, no further attempt is made until
+        reconnect() is called, so a missing MongoDB server costs a single
+        timeout rather than one per request. Other errors are raised and the
+        next request tries again. Requests arriving during the attempt wait
+        for its outcome.
+        """
+        if self.client is None and not self._connect_attempted:
+            with self._connect_lock:
+                if self.client is None and not self._connect_attempted:
+                    self._connect()
     
     def _connect(self):
-        """Establish MongoDB connection."""
+        """
+        Establish MongoDB connection.
+        
+        The client and database handles are only published once the server
+        has answered and indexes have been created, so other threads never
+        see a half-initialized connection. A failure to create indexes is
+        logged but keeps the connection: queries work without them.
+        """
+        client = None
         try:
-            self.client = MongoClient(
+            client = MongoClient(
                 MONGO_URI,
                 serverSelectionTimeoutMS=5000,
                 connectTimeoutMS=5000
             )
             # Test connection
-            self.client.admin.command('ping')
-            self.db = self.client[DB_NAME]
-            self._create_indexes()
-            print(f"✓ Connected to MongoDB: {DB_NAME}")
+            client.admin.command('ping')
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
             print(f"✗ MongoDB connection failed: {e}")
             self.client = None
             self.db = None
+            if client is not None:
+                client.close()
+            self._connect_attempted = True
+            return
+        except Exception:
+            if client is not None:
+                client.close()
+            raise
+        
+        database = client[DB_NAME]
+        try:
+            self._create_indexes(database)
+        except PyMongoError as e:
+            print(f"⚠ Failed to create MongoDB indexes: {e}")
+        
+        self.db = database
+        self.client = client
+        self._connect_attempted = True
+        print(f"✓ Connected to MongoDB: {DB_NAME}")
     
-    def _create_indexes(self):
-        """Create indexes for better query performance."""
-        if self.db is None:
+    def _create_indexes(self, database=None):
+        """Create indexes for better query performance (once per process)."""
+        database = self.db if database is None else database
+        if database is None or self._indexes_created:
             return
         
         # Products collection indexes
-        self.db.products.create_index([
+        # Serves per-source pages sorted by price; _id keeps ties in a stable order
+        database.products.create_index([
             ("search_key", ASCENDING),
-            ("source", ASCENDING)
+            ("source", ASCENDING),
+            ("price", ASCENDING),
+            ("_id", ASCENDING)
         ])
-        self.db.products.create_index([("cached_at", ASCENDING)])
-        self.db.products.create_index([("price", ASCENDING)])
+        database.products.create_index([("cached_at", ASCENDING)])
+        database.products.create_index([("price", ASCENDING)])
         
         # Search cache collection indexes
-        self.db.search_cache.create_index([("search_key", ASCENDING)], unique=True)
-        self.db.search_cache.create_index([("cached_at", ASCENDING)])
+        database.search_cache.create_index([("search_key", ASCENDING)], unique=True)
+        database.search_cache.create_index([("cached_at", ASCENDING)])
+        # Filtered invalidation (by country and/or product type)
+        database.search_cache.create_index([
+            ("country_code", ASCENDING),
+            ("product_type", ASCENDING),
+            ("cached_at", ASCENDING)
+        ])
+        database.search_cache.create_index([
+            ("product_type", ASCENDING),
+            ("cached_at", ASCENDING)
+        ])
+        
+        # Background invalidation jobs, kept for a day
+        database.invalidation_jobs.create_index(
+            [("started_at", ASCENDING)],
+            expireAfterSeconds=24 * 3600
+        )
+        
+        # Product catalog: one entry per listing, across all searches
+        database.catalog.create_index([("link_key", ASCENDING)], unique=True)
+        # Keyword + price range queries and token prefix (typeahead) scans
+        database.catalog.create_index([("tokens", ASCENDING), ("price", ASCENDING)])
+        self._create_ttl_index(
+            database.catalog, [("last_seen", ASCENDING)],
+            CATALOG_TTL_DAYS * 24 * 3600
+        )
+        
+        # Price history: one bucket per product per day
+        database.price_history.create_index(
+            [("link_key", ASCENDING), ("day", ASCENDING)], unique=True
+        )
+        # Biggest price changes on a given day
+        database.price_history.create_index([("day", ASCENDING), ("change", ASCENDING)])
+        self._create_ttl_index(
+            database.price_history, [("day", ASCENDING)],
+            PRICE_HISTORY_RETENTION_DAYS * 24 * 3600, name="day_ttl"
+        )
+        
+        # Search history collection, kept for SEARCH_HISTORY_RETENTION_DAYS
+        self._create_ttl_index(
+            database.search_history, [("searched_at", ASCENDING)],
+            SEARCH_HISTORY_RETENTION_DAYS * 24 * 3600, name="searched_at_ttl"
+        )
+        database.search_history.create_index([("search_key", ASCENDING)])
         
-        # Search history collection
-        self.db.search_history.create_index([("searched_at", DESCENDING)])
+        # Failed prewarms (keyed by search_key), forgotten after a week
+        database.prewarm_failures.create_index(
+            [("failed_at", ASCENDING)],
+            expireAfterSeconds=7 * 24 * 3600
+        )
+        
+        self._indexes_created = True
+    
+    @staticmethod
+    def _create_ttl_index(collection, keys: List, expire_after_seconds: int, name: str = None):
+        """
+        Create a TTL index, or update its expiry if it exists with another one.
+        
+        The retention settings come from the environment; create_index
+        refuses to change an existing index's options, so a new value is
+        applied with collMod instead.
+        """
+        options = {"name": name} if name else {}
+        try:
+            collection.create_index(keys, expireAfterSeconds=expire_after_seconds, **options)
+        except OperationFailure as e:
+            # IndexOptionsConflict / IndexKeySpecsConflict
+            if e.code not in (85, 86):
+                raise
+            index = {"name": name} if name else {"keyPattern": dict(keys)}
+            collection.database.command(
+                "collMod", collection.name,
+                index={**index, "expireAfterSeconds": expire_after_seconds}
+            )
+            print(f"✓ Updated {collection.name} TTL to {expire_after_seconds}s")
     
     def is_connected(self) -> bool:
         """Check if database is connected."""
+        self._ensure_connection()
         if self.client is None:
             return False
         try:
@@ -92,7 +267,8 @@ class ProductDatabase:
     
     def reconnect(self):
         """Attempt to reconnect to database."""
-        self._connect()
+        with self._connect_lock:
+            self._connect()
     
     @staticmethod
     def generate_search_key(country_code: str, product_type: str, min_price: int, max_price: int) -> str:
@@ -105,11 +281,26 @@ class ProductDatabase:
         country_code: str,
         product_type: str,
         min_price: int,
-        max_price: int
+        max_price: int,
+        page: int = 1,
+        limit: int = None,
+        sort: str = "price_asc",
+        fields: List[str] = None,
+        source: str = None
     ) -> Optional[Dict]:
         """
         Get cached products if they exist and are fresh.
         
+        Paging, sorting and field selection are done by MongoDB, so only
+        the products being returned are read.
+        
+        Args:
+            page: Page number (1-based), applied to each source separately
+            limit: Products per source per page, None for all
+            sort: One of SORT_ORDERS
+            fields: Product fields to return, None for all
+            source: Only return products from this source
+        
         Returns:
             Dict with products and metadata if cache is valid, None otherwise
         """
@@ -117,50 +308,222 @@ class ProductDatabase:
             return None
         
         search_key = self.generate_search_key(country_code, product_type, min_price, max_price)
+        result = self._read_cache(search_key, page, limit, sort, fields, source)
         
-        # Check if we have a valid cache entry
-        cache_entry = self.db.search_cache.find_one({"search_key": search_key})
+        # Fetching further pages is not a new search
+        if result is not None and page == 1 and source is None:
+            # Cache hits are user traffic too; log them so popular searches
+            # (and prewarming) reflect what users actually ask for
+            self.log_lookup(country_code, product_type, min_price, max_price, result["count"], cache_hit=True)
         
-        if cache_entry is None:
-            return None
+        return result
+    
+    def get_cache_entry(
+        self,
+        country_code: str,
+        product_type: str,
+        min_price: int,
+        max_price: int
+    ) -> Optional[Dict]:
+        """
+        Get the search cache entry (not its products) if it is fresh.
         
-        # Check if cache is still fresh
-        cache_age = datetime.utcnow() - cache_entry["cached_at"]
-        if cache_age > timedelta(hours=CACHE_TTL_HOURS):
+        Cheap enough to answer conditional requests on every hit.
+        """
+        if not self.is_connected():
             return None
         
-        # Get products for this search
-        products = list(self.db.products.find(
+        search_key = self.generate_search_key(country_code, product_type, min_price, max_price)
+        cache_entry = self.db.search_cache.find_one(
             {"search_key": search_key},
-            {"_id": 0}  # Exclude MongoDB _id from results
-        ))
+            {"_id": 0, "search_key": 1, "cached_at": 1, "product_count": 1}
+        )
+        
+        return cache_entry if self.is_fresh(cache_entry) else None
+    
+    def _read_cache(
+        self,
+        search_key: str,
+        page: int = 1,
+        limit: int = None,
+        sort: str = "price_asc",
+        fields: List[str] = None,
+        source: str = None
+    ) -> Optional[Dict]:
+        """Read a page of a fresh cache entry, or None."""
+        # Check if we have a valid, fresh cache entry
+        cache_entry = self.db.search_cache.find_one({"search_key": search_key})
+        if not self.is_fresh(cache_entry):
+            return None
+        
+        # Entries cached before per-source counts were stored need counting
+        source_counts = cache_entry.get("source_counts")
+        if source_counts is None:
+            source_counts = self.source_counts(
+                self.db.products.aggregate(self.source_count_pipeline(search_key))
+            )
         
-        if not products:
+        source_counts = self.page_sources(source_counts, source)
+        if source_counts is None:
             return None
         
-        # Group products by source
+        # Get one page of products for each source
         grouped = {}
-        for product in products:
-            source = product.get("source", "Unknown")
-            if source not in grouped:
-                grouped[source] = []
-            # Remove internal fields before returning
-            product_copy = {k: v for k, v in product.items() 
-                          if k not in ["search_key", "cached_at"]}
-            grouped[source].append(product_copy)
-        
-        # Sort each group by price
-        for source in grouped:
-            grouped[source].sort(key=lambda x: x.get("price", 0))
+        for src in source_counts:
+            cursor = self.page_cursor(self.db, search_key, src, page, limit, sort, fields)
+            grouped[src] = list(cursor)
+        
+        return self.cached_result(grouped, source_counts, page, limit, sort, cache_entry)
+    
+    # Cache read steps below take no database handle, or take it as an
+    # argument, so AsyncProductDatabase runs the same reads asynchronously
+    
+    @staticmethod
+    def is_fresh(cache_entry: Optional[Dict]) -> bool:
+        """Check that a search cache entry exists and has not expired."""
+        if cache_entry is None:
+            return False
+        return datetime.utcnow() - cache_entry["cached_at"] <= timedelta(hours=CACHE_TTL_HOURS)
+    
+    @staticmethod
+    def source_count_pipeline(search_key: str) -> List[Dict]:
+        """Aggregation counting a search's cached products per source."""
+        return [
+            {"$match": {"search_key": search_key}},
+            {"$group": {"_id": "$source", "count": {"$sum": 1}}}
+        ]
+    
+    @staticmethod
+    def source_counts(docs) -> Dict[str, int]:
+        """Per-source counts from the results of source_count_pipeline()."""
+        return {doc["_id"] or "Unknown": doc["count"] for doc in docs}
+    
+    @staticmethod
+    def page_sources(source_counts: Dict[str, int], source: Optional[str]) -> Optional[Dict[str, int]]:
+        """Sources to read a page from (and their totals), or None if the entry is empty."""
+        if not sum(source_counts.values()):
+            return None
+        if source is not None:
+            return {source: source_counts.get(source, 0)}
+        return source_counts
+    
+    @staticmethod
+    def page_cursor(
+        database,
+        search_key: str,
+        source: str,
+        page: int,
+        limit: Optional[int],
+        sort: str,
+        fields: Optional[List[str]]
+    ):
+        """
+        Cursor over one page of a source's cached products.
         
+        `database` may be a sync or async database handle.
+        """
+        if fields:
+            projection = {field: 1 for field in fields}
+            projection["_id"] = 0
+        else:
+            # Exclude MongoDB _id and internal fields from results
+            projection = {"_id": 0, "search_key": 0, "cached_at": 0}
+        
+        direction = SORT_ORDERS[sort]
+        cursor = database.products.find(
+            {"search_key": search_key, "source": source},
+            projection
+        ).sort([("price", direction), ("_id", direction)])
+        
+        if limit:
+            cursor = cursor.skip((page - 1) * limit).limit(limit)
+        return cursor
+    
+    @classmethod
+    def cached_result(
+        cls,
+        grouped: Dict[str, List],
+        source_counts: Dict[str, int],
+        page: int,
+        limit: Optional[int],
+        sort: str,
+        cache_entry: Dict
+    ) -> Dict:
+        """Response body for a page read from the cache."""
+        cache_age = datetime.utcnow() - cache_entry["cached_at"]
         return {
-            "count": len(products),
-            "grouped": grouped,
+            **cls._page_metadata(grouped, source_counts, page, limit, sort),
             "cached": True,
             "cached_at": cache_entry["cached_at"].isoformat(),
             "cache_expires_in": str(timedelta(hours=CACHE_TTL_HOURS) - cache_age)
         }
     
+    @staticmethod
+    def _page_metadata(
+        grouped: Dict[str, List],
+        source_counts: Dict[str, int],
+        page: int,
+        limit: Optional[int],
+        sort: str
+    ) -> Dict:
+        """Build the paged response body shared by cached and fresh results."""
+        return {
+            "count": sum(source_counts.values()),
+            "returned": sum(len(products) for products in grouped.values()),
+            "grouped": grouped,
+            "pagination": {
+                src: {
+                    "page": page,
+                    "limit": limit,
+                    "total": total,
+                    "has_more": bool(limit) and page * limit < total
+                }
+                for src, total in source_counts.items()
+            },
+            "sort": sort
+        }
+    
+    @classmethod
+    def page_products(
+        cls,
+        grouped_products: Dict[str, List],
+        page: int = 1,
+        limit: int = None,
+        sort: str = "price_asc",
+        fields: List[str] = None,
+        source: str = None
+    ) -> Dict:
+        """
+        Page, sort and project freshly scraped products in memory.
+        
+        Mirrors get_cached_products() for results that were not read
+        from the database.
+        """
+        if source is not None:
+            grouped_products = {source: grouped_products.get(source, [])}
+        
+        grouped = {}
+        source_counts = {}
+        for src, products in grouped_products.items():
+            # Break price ties by insertion order, reversed when descending,
+            # to match the (price, _id) order of cached pages
+            products = [p for _, p in sorted(
+                enumerate(products),
+                key=lambda item: (item[1].get("price", 0), item[0]),
+                reverse=sort == "price_desc"
+            )]
+            if limit:
+                products = products[(page - 1) * limit:page * limit]
+            if fields:
+                products = [
+                    {field: p[field] for field in fields if field in p}
+                    for p in products
+                ]
+            grouped[src] = products
+            source_counts[src] = len(grouped_products[src])
+        
+        return cls._page_metadata(grouped, source_counts, page, limit, sort)
+    
     def save_products(
         self,
         country_code: str,
@@ -194,10 +557,13 @@ class ProductDatabase:
             
             # Prepare products for insertion
             all_products = []
+            source_counts = {}
             for source, products in grouped_products.items():
+                source_counts[source] = len(products)
                 for product in products:
                     product_doc = {
                         **product,
+                        "source": source,
                         "search_key": search_key,
                         "cached_at": now
                     }
@@ -206,6 +572,7 @@ class ProductDatabase:
             # Insert all products
             if all_products:
                 self.db.products.insert_many(all_products)
+                self._update_catalog(all_products, country_code, product_type, now)
             
             # Update search cache entry
             self.db.search_cache.update_one(
@@ -218,22 +585,15 @@ class ProductDatabase:
                         "min_price": min_price,
                         "max_price": max_price,
                         "product_count": len(all_products),
+                        "source_counts": source_counts,
                         "cached_at": now
                     }
                 },
                 upsert=True
             )
             
-            # Log search history
-            self.db.search_history.insert_one({
-                "search_key": search_key,
-                "country_code": country_code,
-                "product_type": product_type,
-                "min_price": min_price,
-                "max_price": max_price,
-                "results_count": len(all_products),
-                "searched_at": now
-            })
+            # A search that scrapes again is no longer backed off
+            self.db.prewarm_failures.delete_one({"_id": search_key})
             
             print(f"✓ Cached {len(all_products)} products for search: {product_type}")
             return True
@@ -242,17 +602,491 @@ class ProductDatabase:
             print(f"✗ Failed to save products: {e}")
             return False
     
+    def _update_catalog(
+        self,
+        products: List[Dict],
+        country_code: str,
+        product_type: str,
+        seen_at: datetime,
+        record_history: bool = True
+    ):
+        """
+        Upsert scraped products into the catalog, deduplicated by link.
+        
+        Entries already seen after `seen_at` keep their newer data. Price
+        changes against the catalog's previous prices are recorded in the
+        price history.
+        """
+        entries = {}
+        for product in products:
+            if not product.get("link"):
+                continue
+            
+            link_key = normalize_link(product["link"])
+            # Later duplicates in the same batch win
+            entries[link_key] = {
+                "link_key": link_key,
+                "link": product["link"],
+                "title": product.get("title", ""),
+                "normalized_title": normalize_title(product.get("title", "")),
+                "tokens": title_tokens(product.get("title", "")),
+                "price": product.get("price"),
+                "currency": product.get("currency"),
+                "image": product.get("image"),
+                "source": product.get("source"),
+                "country_code": country_code,
+                "product_type": product_type,
+                "last_seen": seen_at
+            }
+        
+        if not entries:
+            return
+        
+        try:
+            if record_history:
+                # Previous prices, read before the catalog is overwritten
+                previous = {
+                    doc["link_key"]: doc.get("price")
+                    for doc in self.db.catalog.find(
+                        {"link_key": {"$in": list(entries)}},
+                        {"_id": 0, "link_key": 1, "price": 1}
+                    )
+                }
+            
+            link_keys = list(entries)
+            try:
+                self.db.catalog.bulk_write([
+                    UpdateOne(
+                        {"link_key": link_key, "last_seen": {"$lt": seen_at}},
+                        {"$set": entries[link_key]},
+                        upsert=True
+                    )
+                    for link_key in link_keys
+                ], ordered=False)
+            except BulkWriteError as e:
+                # Newer entries don't match the filter, so their upsert hits
+                # the unique link_key index; they are left as they are
+                errors = e.details["writeErrors"]
+                if any(error["code"] != 11000 for error in errors):
+                    raise
+                for error in errors:
+                    entries.pop(link_keys[error["index"]])
+            
+            if record_history:
+                self._record_price_changes(entries, previous, seen_at)
+        except Exception as e:
+            # The catalog is derived data; never fail a cache write over it
+            print(f"✗ Failed to update catalog: {e}")
+    
+    def _record_price_changes(
+        self,
+        entries: Dict[str, Dict],
+        previous: Dict[str, Optional[int]],
+        seen_at: datetime
+    ):
+        """
+        Append changed prices to each product's bucket for the day.
+        
+        Buckets keep the day's opening price (the price before its first
+        change) and closing price, so daily changes need no scan of the
+        observations.
+        """
+        day = datetime(seen_at.year, seen_at.month, seen_at.day)
+        updates = []
+        
+        for link_key, product in entries.items():
+            price = product.get("price")
+            prev = previous.get(link_key)
+            
+            # Only changes are stored; first sightings start the series
+            if not price or price == prev:
+                continue
+            
+            opening = prev if prev else price
+            # Values in a pipeline update are expressions; scraped strings
+            # (e.g. a title starting with "$") must be taken literally
+            updates.append(UpdateOne(
+                {"link_key": link_key, "day": day},
+                [
+                    {"$set": {
+                        "link_key": {"$literal": link_key},
+                        "day": day,
+                        "title": {"$literal": product.get("title")},
+                        "source": {"$literal": product.get("source")},
+                        "currency": {"$literal": product.get("currency")},
+                        "link": {"$literal": product.get("link")},
+                        "open": {"$ifNull": ["$open", opening]},
+                        "close": price,
+                        "observations": {"$concatArrays": [
+                            {"$ifNull": ["$observations", []]},
+                            [{"t": seen_at, "price": price}]
+                        ]}
+                    }},
+                    {"$set": {
+                        "change": {"$subtract": ["$close", "$open"]},
+                        "count": {"$size": "$observations"}
+                    }}
+                ],
+                upsert=True
+            ))
+        
+        if updates:
+            self.db.price_history.bulk_write(updates, ordered=False)
+    
+    def get_price_trend(self, link: str, days: int = 30) -> Optional[Dict]:
+        """
+        Get a product's price changes over the last `days` days.
+        
+        Returns:
+            Dict with the price at the start of the range and each change
+            since, or None if the product has no history
+        """
+        if not self.is_connected():
+            return None
+        
+        link_key = normalize_link(link)
+        now = datetime.utcnow()
+        start = datetime(now.year, now.month, now.day) - timedelta(days=days - 1)
+        
+        buckets = list(self.db.price_history.find(
+            {"link_key": link_key, "day": {"$gte": start}},
+            {"_id": 0}
+        ).sort("day", ASCENDING))
+        
+        # Price carried into the range from the last change before it
+        before = self.db.price_history.find_one(
+            {"link_key": link_key, "day": {"$lt": start}},
+            {"_id": 0, "observations": 0},
+            sort=[("day", DESCENDING)]
+        )
+        
+        if not buckets and before is None:
+            return None
+        
+        points = [
+            {"t": obs["t"].isoformat(), "price": obs["price"]}
+            for bucket in buckets
+            for obs in bucket["observations"]
+        ]
+        prices = [p["price"] for p in points]
+        if before is not None:
+            prices.insert(0, before["close"])
+        
+        latest = buckets[-1] if buckets else before
+        return {
+            "link_key": link_key,
+            "title": latest.get("title"),
+            "source": latest.get("source"),
+            "currency": latest.get("currency"),
+            "days": days,
+            "start_price": before["close"] if before else None,
+            "current_price": prices[-1],
+            "min_price": min(prices),
+            "max_price": max(prices),
+            "changes": points
+        }
+    
+    def get_biggest_drops(self, limit: int = 10, day: datetime = None) -> List[Dict]:
+        """
+        Get the products whose price fell the most on a day (default: today).
+        
+        Uses the (day, change) index, so only the returned buckets are read.
+        """
+        if not self.is_connected():
+            return []
+        
+        day = day or datetime.utcnow()
+        day = datetime(day.year, day.month, day.day)
+        
+        cursor = self.db.price_history.find(
+            {"day": day, "change": {"$lt": 0}},
+            {"_id": 0, "observations": 0}
+        ).sort("change", ASCENDING).limit(limit)
+        
+        drops = []
+        for bucket in cursor:
+            bucket["day"] = bucket["day"].isoformat()
+            bucket["drop_percent"] = round(-bucket["change"] * 100 / bucket["open"], 1)
+            drops.append(bucket)
+        return drops
+    
+    def rebuild_catalog(self, batch_size: int = 1000) -> int:
+        """
+        Index every cached product into the catalog.
+        
+        Only needed for products cached before the catalog existed; new
+        scrapes are indexed by save_products.
+        
+        Returns:
+            Number of products processed
+        """
+        if not self.is_connected():
+            return 0
+        
+        # search_key -> (country_code, product_type)
+        searches = {
+            doc["search_key"]: (doc.get("country_code"), doc.get("product_type"))
+            for doc in self.db.search_cache.find(
+                {}, {"_id": 0, "search_key": 1, "country_code": 1, "product_type": 1}
+            )
+        }
+        
+        processed = 0
+        batch = []
+        
+        def flush():
+            # Products of one search share country and product type
+            by_search = {}
+            for product in batch:
+                by_search.setdefault(product["search_key"], []).append(product)
+            for search_key, products in by_search.items():
+                country_code, product_type = searches.get(search_key, (None, None))
+                # Backfilled prices are not ordered in time, so they are not
+                # recorded as price history
+                self._update_catalog(
+                    products, country_code, product_type,
+                    products[0].get("cached_at") or datetime.utcnow(),
+                    record_history=False
+                )
+            batch.clear()
+        
+        for product in self.db.products.find({}, {"_id": 0}).batch_size(batch_size):
+            batch.append(product)
+            processed += 1
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        
+        return processed
+    
+    def search_catalog(
+        self,
+        query: str,
+        min_price: int = None,
+        max_price: int = None,
+        country_code: str = None,
+        source: str = None,
+        sort: str = "price_asc",
+        limit: int = 20
+    ) -> List[Dict]:
+        """
+        Keyword search over every cached product, without scraping.
+        
+        All query words must appear in the title. Results are unique by link.
+        """
+        if not self.is_connected():
+            return []
+        
+        tokens = title_tokens(query)
+        if not tokens:
+            return []
+        
+        criteria = {"tokens": {"$all": tokens}}
+        
+        price = {}
+        if min_price is not None:
+            price["$gte"] = min_price
+        if max_price is not None:
+            price["$lte"] = max_price
+        if price:
+            criteria["price"] = price
+        
+        if country_code:
+            criteria["country_code"] = country_code
+        if source:
+            criteria["source"] = source
+        
+        cursor = self.db.catalog.find(
+            criteria,
+            {"_id": 0, "title": 1, "price": 1, "currency": 1, "image": 1,
+             "link": 1, "source": 1, "last_seen": 1}
+        ).sort("price", SORT_ORDERS[sort]).limit(limit)
+        
+        results = []
+        for product in cursor:
+            product["last_seen"] = product["last_seen"].isoformat()
+            results.append(product)
+        return results
+    
+    def suggest_titles(self, prefix: str, limit: int = 8) -> List[str]:
+        """
+        Typeahead: titles whose words match the typed text.
+        
+        Complete words must match exactly, the last (partial) word by prefix.
+        """
+        if not self.is_connected():
+            return []
+        
+        words = normalize_title(prefix).split()
+        if not words or (len(words) == 1 and len(words[-1]) < 2):
+            return []
+        
+        # Anchored prefix regexes can use the tokens index
+        criteria = [{"tokens": {"$regex": f"^{re.escape(words[-1])}"}}]
+        if len(words) > 1:
+            criteria.append({"tokens": {"$all": words[:-1]}})
+        
+        suggestions = []
+        seen = set()
+        cursor = self.db.catalog.find(
+            {"$and": criteria},
+            {"_id": 0, "title": 1, "normalized_title": 1}
+        ).limit(limit * 5)
+        
+        for doc in cursor:
+            if doc["normalized_title"] in seen:
+                continue
+            seen.add(doc["normalized_title"])
+            suggestions.append(doc["title"])
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+    
+    @staticmethod
+    def search_history_entry(
+        search_key: str,
+        country_code: str,
+        product_type: str,
+        min_price: int,
+        max_price: int,
+        results_count: int,
+        cache_hit: bool = False,
+        searched_at: datetime = None
+    ) -> Dict:
+        """Search history document for a user search."""
+        return {
+            "search_key": search_key,
+            "country_code": country_code,
+            "product_type": product_type,
+            "min_price": min_price,
+            "max_price": max_price,
+            "results_count": results_count,
+            "cache_hit": cache_hit,
+            "searched_at": searched_at or datetime.utcnow()
+        }
+    
+    def _log_search(self, *args, **kwargs):
+        """Record a user search in the search history (see search_history_entry)."""
+        try:
+            self.db.search_history.insert_one(self.search_history_entry(*args, **kwargs))
+        except Exception as e:
+            print(f"✗ Failed to log search: {e}")
+    
+    def log_lookup(
+        self,
+        country_code: str,
+        product_type: str,
+        min_price: int,
+        max_price: int,
+        results_count: int,
+        cache_hit: bool
+    ):
+        """
+        Record a user search as answered from cache (including 304
+        revalidations) or scraped, whatever the scrape returned.
+        
+        Callers log first pages only; fetching further pages is not a new
+        search. Background refreshes and prewarms are not logged, so they
+        don't inflate popularity.
+        """
+        if not self.is_connected():
+            return
+        
+        search_key = self.generate_search_key(country_code, product_type, min_price, max_price)
+        self._log_search(
+            search_key, country_code, product_type, min_price, max_price,
+            results_count, cache_hit=cache_hit
+        )
+    
+    def get_lookup_stats(self, since: datetime = None) -> Dict:
+        """
+        Get the fraction of user searches answered from cache.
+        
+        Derived from the search history, so it covers every worker and
+        survives restarts. Hits are logged on lookup and misses once they
+        have been scraped (see log_lookup).
+        
+        Args:
+            since: Only count searches made after this time
+                   (default: the last LOOKUP_STATS_HOURS hours)
+        """
+        if since is None:
+            since = datetime.utcnow() - timedelta(hours=LOOKUP_STATS_HOURS)
+        
+        counts = {
+            doc["_id"]: doc["count"]
+            for doc in self.db.search_history.aggregate([
+                {"$match": {"searched_at": {"$gte": since}}},
+                {"$group": {"_id": "$cache_hit", "count": {"$sum": 1}}}
+            ])
+        }
+        warm = counts.get(True, 0)
+        cold = counts.get(False, 0)
+        
+        total = warm + cold
+        return {
+            "since": since.isoformat(),
+            "warm": warm,
+            "cold": cold,
+            "warm_ratio": round(warm / total, 4) if total else None
+        }
+    
+    @staticmethod
+    def _cache_filter(country_code: str = None, product_type: str = None) -> Dict:
+        """Query selecting search cache entries by country and product type."""
+        query = {}
+        if country_code:
+            query["country_code"] = country_code
+        if product_type:
+            query["product_type"] = product_type
+        return query
+    
+    def count_cache_entries(self, country_code: str = None, product_type: str = None) -> int:
+        """Count search cache entries an invalidation would remove."""
+        if not self.is_connected():
+            return 0
+        
+        query = self._cache_filter(country_code, product_type)
+        if not query:
+            return self.db.search_cache.estimated_document_count()
+        return self.db.search_cache.count_documents(query)
+    
+    def invalidate_search(self, search_key: str) -> bool:
+        """
+        Invalidate the cache for a single search.
+        
+        Returns:
+            True if a cache entry was removed
+        """
+        if not self.is_connected():
+            return False
+        
+        self.db.products.delete_many({"search_key": search_key})
+        result = self.db.search_cache.delete_one({"search_key": search_key})
+        return result.deleted_count > 0
+    
     def invalidate_cache(
         self,
         country_code: str = None,
-        product_type: str = None
+        product_type: str = None,
+        batch_size: int = INVALIDATE_BATCH_SIZE,
+        on_progress=None
     ) -> int:
         """
         Invalidate (delete) cached data.
         
+        Entries are deleted in batches of `batch_size` search keys found
+        through the search_cache indexes, so memory use does not grow with
+        the size of the cache and the collections (and their indexes) stay
+        in place for concurrent writes. Entries cached after invalidation
+        started are kept.
+        
         Args:
             country_code: Optional country code filter
             product_type: Optional product type filter
+            batch_size: Search keys deleted per batch
+            on_progress: Optional callback, called with the running total
+                         after each batch
             
         Returns:
             Number of cache entries invalidated
@@ -260,27 +1094,124 @@ class ProductDatabase:
         if not self.is_connected():
             return 0
         
-        query = {}
-        if country_code:
-            query["country_code"] = country_code
-        if product_type:
-            query["product_type"] = product_type
+        query = self._cache_filter(country_code, product_type)
+        everything = not query
         
-        if not query:
-            # Delete all cache
-            search_keys = [doc["search_key"] for doc in self.db.search_cache.find()]
-            self.db.products.delete_many({"search_key": {"$in": search_keys}})
-            result = self.db.search_cache.delete_many({})
-            return result.deleted_count
+        # Leave entries (and their products) re-cached while this runs
+        not_newer = {"$lte": datetime.utcnow()}
+        query["cached_at"] = not_newer
+        invalidated = 0
+        
+        while True:
+            # Re-query each batch rather than holding a cursor open while
+            # deleting from the same collection
+            search_keys = [
+                doc["search_key"]
+                for doc in self.db.search_cache.find(
+                    query, {"_id": 0, "search_key": 1}
+                ).limit(batch_size)
+            ]
+            if not search_keys:
+                break
+            
+            self.db.products.delete_many(
+                {"search_key": {"$in": search_keys}, "cached_at": not_newer}
+            )
+            result = self.db.search_cache.delete_many(
+                {"search_key": {"$in": search_keys}, "cached_at": not_newer}
+            )
+            invalidated += result.deleted_count
+            
+            if on_progress:
+                on_progress(invalidated)
+        
+        # Also remove products left without a cache entry (e.g. by a failed save)
+        if everything:
+            self.db.products.delete_many({"cached_at": not_newer})
+        
+        return invalidated
+    
+    def start_invalidation(
+        self,
+        country_code: str = None,
+        product_type: str = None,
+        on_done=None
+    ) -> Optional[str]:
+        """
+        Invalidate cached data in a background thread.
+        
+        Progress is stored in the invalidation_jobs collection, so any
+        worker can report it (see get_invalidation_job).
+        
+        Args:
+            country_code: Optional country code filter
+            product_type: Optional product type filter
+            on_done: Optional callback, called in the background thread
+                     once the job has finished (or failed)
+        
+        Returns:
+            Job id, or None if the database is not connected
+        """
+        if not self.is_connected():
+            return None
+        
+        job_id = uuid.uuid4().hex
+        self.db.invalidation_jobs.insert_one({
+            "_id": job_id,
+            "country_code": country_code,
+            "product_type": product_type,
+            "status": "running",
+            "total": self.count_cache_entries(country_code, product_type),
+            "invalidated": 0,
+            "started_at": datetime.utcnow(),
+            "finished_at": None,
+            "error": None
+        })
+        
+        threading.Thread(
+            target=self._run_invalidation,
+            args=(job_id, country_code, product_type, on_done),
+            name=f"invalidate-{job_id[:8]}",
+            daemon=True
+        ).start()
+        
+        return job_id
+    
+    def _run_invalidation(self, job_id: str, country_code: str, product_type: str, on_done=None):
+        """Run an invalidation job, recording its progress."""
+        def report(invalidated):
+            self.db.invalidation_jobs.update_one(
+                {"_id": job_id}, {"$set": {"invalidated": invalidated}}
+            )
         
-        # Delete specific cache entries
-        cache_entries = list(self.db.search_cache.find(query))
-        search_keys = [entry["search_key"] for entry in cache_entries]
+        try:
+            invalidated = self.invalidate_cache(country_code, product_type, on_progress=report)
+            update = {"status": "done", "invalidated": invalidated}
+        except Exception as e:
+            print(f"✗ Invalidation job {job_id} failed: {e}")
+            update = {"status": "failed", "error": str(e)}
         
-        self.db.products.delete_many({"search_key": {"$in": search_keys}})
-        result = self.db.search_cache.delete_many(query)
+        update["finished_at"] = datetime.utcnow()
+        try:
+            self.db.invalidation_jobs.update_one({"_id": job_id}, {"$set": update})
+        finally:
+            if on_done:
+                on_done()
+    
+    def get_invalidation_job(self, job_id: str) -> Optional[Dict]:
+        """Get the status and progress of an invalidation job."""
+        if not self.is_connected():
+            return None
         
-        return result.deleted_count
+        job = self.db.invalidation_jobs.find_one({"_id": job_id})
+        if job is None:
+            return None
+        
+        job["job_id"] = job.pop("_id")
+        for field in ("started_at", "finished_at"):
+            if job[field] is not None:
+                job[field] = job[field].isoformat()
+        return job
     
     def get_stale_searches(self) -> List[Dict]:
         """Get all searches with stale (expired) cache."""
@@ -294,12 +1225,22 @@ class ProductDatabase:
             {"_id": 0}
         ))
     
-    def get_popular_searches(self, limit: int = 10) -> List[Dict]:
-        """Get most popular searches based on history."""
+    def get_popular_searches(self, limit: int = 10, since: datetime = None) -> List[Dict]:
+        """
+        Get most popular searches based on history.
+        
+        Args:
+            limit: Maximum number of searches to return
+            since: Only count searches made after this time
+        """
         if not self.is_connected():
             return []
         
-        pipeline = [
+        pipeline = []
+        if since is not None:
+            pipeline.append({"$match": {"searched_at": {"$gte": since}}})
+        
+        pipeline += [
             {
                 "$group": {
                     "_id": {
@@ -318,24 +1259,134 @@ class ProductDatabase:
         
         return list(self.db.search_history.aggregate(pipeline))
     
+    def get_prewarm_candidates(
+        self,
+        limit: int = 10,
+        expiring_within: timedelta = timedelta(0),
+        since: datetime = None
+    ) -> List[Dict]:
+        """
+        Get popular searches whose cache is missing or about to expire.
+        
+        Searches whose last prewarm failed are skipped until their retry
+        time (see record_prewarm_failure).
+        
+        Args:
+            limit: Number of popular searches to consider (top-N)
+            expiring_within: Also include entries expiring within this window
+            since: Only count searches made after this time
+        
+        Returns:
+            Search parameters in popularity order
+        """
+        if not self.is_connected():
+            return []
+        
+        popular = self.get_popular_searches(limit, since=since)
+        if not popular:
+            return []
+        
+        # Spellings of one search (e.g. "Phone" and "phone") share a cache
+        # entry; merge them so it is only scraped once
+        by_key = {}
+        for s in popular:
+            params = dict(s["_id"])
+            search_key = self.generate_search_key(
+                params["country_code"], params["product_type"],
+                params["min_price"], params["max_price"]
+            )
+            if search_key in by_key:
+                by_key[search_key]["search_count"] += s["count"]
+                continue
+            params["search_key"] = search_key
+            params["search_count"] = s["count"]
+            by_key[search_key] = params
+        
+        searches = sorted(by_key.values(), key=lambda s: s["search_count"], reverse=True)
+        
+        search_keys = [s["search_key"] for s in searches]
+        now = datetime.utcnow()
+        
+        cached_at = {
+            doc["search_key"]: doc["cached_at"]
+            for doc in self.db.search_cache.find(
+                {"search_key": {"$in": search_keys}},
+                {"_id": 0, "search_key": 1, "cached_at": 1}
+            )
+        }
+        backing_off = {
+            doc["_id"]
+            for doc in self.db.prewarm_failures.find(
+                {"_id": {"$in": search_keys}, "retry_after": {"$gt": now}},
+                {"_id": 1}
+            )
+        }
+        
+        refresh_before = now + expiring_within
+        ttl = timedelta(hours=CACHE_TTL_HOURS)
+        
+        return [
+            s for s in searches
+            if s["search_key"] not in backing_off
+            and (
+                s["search_key"] not in cached_at
+                or cached_at[s["search_key"]] + ttl <= refresh_before
+            )
+        ]
+    
+    def record_prewarm_failure(self, search_key: str):
+        """
+        Back off a search whose prewarm failed or found nothing.
+        
+        It is retried after PREWARM_RETRY_MINUTES, doubling with each
+        consecutive failure up to PREWARM_RETRY_MAX_HOURS, so searches that
+        keep scraping empty don't use up every run's budget. A successful
+        save_products clears it.
+        """
+        if not self.is_connected():
+            return
+        
+        now = datetime.utcnow()
+        
+        try:
+            entry = self.db.prewarm_failures.find_one_and_update(
+                {"_id": search_key},
+                {"$inc": {"failures": 1}, "$set": {"failed_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            backoff = min(
+                timedelta(minutes=PREWARM_RETRY_MINUTES) * 2 ** min(entry["failures"] - 1, 16),
+                timedelta(hours=PREWARM_RETRY_MAX_HOURS)
+            )
+            self.db.prewarm_failures.update_one(
+                {"_id": search_key},
+                {"$set": {"retry_after": now + backoff}}
+            )
+        except Exception as e:
+            print(f"✗ Failed to record prewarm failure: {e}")
+    
     def get_cache_stats(self) -> Dict:
         """Get cache statistics."""
         if not self.is_connected():
             return {"connected": False}
         
         total_products = self.db.products.count_documents({})
+        catalog_products = self.db.catalog.estimated_document_count()
         total_searches = self.db.search_cache.count_documents({})
         stale_searches = len(self.get_stale_searches())
         
         return {
             "connected": True,
             "total_products": total_products,
+            "catalog_products": catalog_products,
             "total_searches_cached": total_searches,
             "stale_searches": stale_searches,
             "fresh_searches": total_searches - stale_searches,
-            "cache_ttl_hours": CACHE_TTL_HOURS
+            "cache_ttl_hours": CACHE_TTL_HOURS,
+            "lookups": self.get_lookup_stats()
         }
 
 
-# Global database instance
+# Global database instance (connects lazily on first use)
 db = ProductDatabase()
@@ -1,7 +1,11 @@
-from playwright.async_api import Page
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    # Playwright is heavy to import; only needed here for type hints
+    from playwright.async_api import Page
 
-async def scrape_priceoye(page: Page, product_type: str, min_price: int, max_price: int):
+
+async def scrape_priceoye(page: "Page", product_type: str, min_price: int, max_price: int):
     """
     Scrape products from PriceOye.pk
     
@@ -0,0 +1,57 @@
+import asyncio
+
+from scrapers.daraz import scrape_daraz
+from scrapers.priceoye import scrape_priceoye
+
+
+async def run_scrapers(pool, country_code: str, product_type: str, min_price: int, max_price: int):
+    """
+    Run the scrapers for a country in parallel using pooled browsers.
+    
+    Args:
+        pool: BrowserPool owned by the running event loop
+        country_code: Country code for the search
+        product_type: Type of product to search (phone, laptop)
+        min_price: Minimum price filter
+        max_price: Maximum price filter
+    
+    Returns:
+        Dict with total count and products grouped by source
+    """
+    # Results grouped by source
+    grouped_results = {}
+    
+    # Add scrapers based on country
+    if country_code == "PK":
+        async def scrape(scraper):
+            # Each scraper gets its own page, closed when it finishes
+            async with pool.page() as page:
+                return await scraper(page, product_type, min_price, max_price)
+        
+        # Run all Pakistani scrapers in parallel (Daraz, PriceOye)
+        sources = ["Daraz", "PriceOye"]
+        results = await asyncio.gather(
+            scrape(scrape_daraz),
+            scrape(scrape_priceoye),
+            return_exceptions=True
+        )
+        
+        # Map results to sources
+        for source, result in zip(sources, results):
+            if isinstance(result, list) and len(result) > 0:
+                # Sort by price within each source
+                result.sort(key=lambda x: x.get('price', 0))
+                grouped_results[source] = result
+                print(f"{source}: {len(result)} products found")
+            elif isinstance(result, Exception):
+                print(f"{source} error: {result}")
+            else:
+                print(f"{source}: No products found")
+    
+    # Calculate total count
+    total_count = sum(len(products) for products in grouped_results.values())
+    
+    return {
+        "count": total_count,
+        "grouped": grouped_results
+    }
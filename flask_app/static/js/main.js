@@ -36,6 +36,19 @@ const toastContainer = document.getElementById('toastContainer');
 // Store last search params for refresh
 let lastSearchParams = null;
 
+// Products loaded per source per page
+const PAGE_SIZE = 20;
+
+// Loaded page per source, for "Load more"
+let sourcePages = {};
+
+// Define source colors and icons
+const sourceStyles = {
+    'Daraz': { color: '#f85606', icon: '🛒' },
+    'PriceOye': { color: '#00a651', icon: '💰' },
+    'OLX': { color: '#002f34', icon: '🏷️' }
+};
+
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
     renderCountryOptions(COUNTRIES);
@@ -218,13 +231,8 @@ async function handleSubmit(e) {
     resultsSection.classList.remove('active');
     
     try {
-        const response = await fetch('/api/scrape', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(lastSearchParams)
-        });
+        // GET so the browser can cache and revalidate the response
+        const response = await fetch(`/api/search?${searchQuery({ limit: PAGE_SIZE })}`);
         
         const data = await response.json();
         
@@ -256,7 +264,7 @@ async function handleRefresh() {
     refreshBtn.classList.add('loading');
     
     try {
-        const response = await fetch('/api/refresh', {
+        const response = await fetch(`/api/refresh?limit=${PAGE_SIZE}`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -284,6 +292,7 @@ async function handleRefresh() {
 // Display results grouped by source
 function displayResults(data) {
     const grouped = data.grouped || {};
+    const pagination = data.pagination || {};
     const totalCount = data.count || 0;
     const isCached = data.cached === true;
     
@@ -299,6 +308,8 @@ function displayResults(data) {
         cacheStatus.textContent = 'Fresh data';
     }
     
+    sourcePages = {};
+    
     if (totalCount === 0) {
         productsGrid.innerHTML = `
             <div class="no-results" style="grid-column: 1 / -1;">
@@ -313,52 +324,116 @@ function displayResults(data) {
     } else {
         let html = '';
         
-        // Define source colors and icons
-        const sourceStyles = {
-            'Daraz': { color: '#f85606', icon: '🛒' },
-            'PriceOye': { color: '#00a651', icon: '💰' },
-            'OLX': { color: '#002f34', icon: '🏷️' }
-        };
-        
         // Loop through each source
         for (const [source, products] of Object.entries(grouped)) {
             if (products && products.length > 0) {
                 const style = sourceStyles[source] || { color: '#3b82f6', icon: '🛍️' };
+                const page = pagination[source] || { page: 1, total: products.length, has_more: false };
+                sourcePages[source] = page.page;
                 
                 html += `
                     <div class="source-section" style="grid-column: 1 / -1;">
                         <div class="source-header" style="border-left-color: ${style.color};">
                             <span class="source-icon">${style.icon}</span>
                             <h3 class="source-title">${source}</h3>
-                            <span class="source-count">${products.length} products</span>
+                            <span class="source-count">${page.total} products</span>
                         </div>
                     </div>
                 `;
                 
-                html += products.map(product => `
-                    <div class="product-card">
-                        <img class="product-image" 
-                             src="${product.image || '/static/images/placeholder.png'}" 
-                             alt="${product.title}"
-                             onerror="this.src='https://via.placeholder.com/280x200?text=No+Image'">
-                        <div class="product-info">
-                            <h3 class="product-title">${product.title || 'Untitled Product'}</h3>
-                            <div class="product-price">${product.currency} ${formatPrice(product.price)}</div>
-                            <a href="${product.link}" target="_blank" rel="noopener noreferrer" class="product-link">
-                                View Details
-                            </a>
-                        </div>
+                html += products.map(renderProductCard).join('');
+                
+                // Marks the end of this source's cards; later pages are inserted before it
+                html += `
+                    <div class="load-more" data-source="${source}" style="grid-column: 1 / -1;"${page.has_more ? '' : ' hidden'}>
+                        <button type="button" class="load-more-btn">Load more from ${source}</button>
                     </div>
-                `).join('');
+                `;
             }
         }
         
         productsGrid.innerHTML = html;
+        
+        productsGrid.querySelectorAll('.load-more').forEach(row => {
+            row.querySelector('.load-more-btn').addEventListener('click', () => {
+                loadMore(row.dataset.source, row);
+            });
+        });
     }
     
     resultsSection.classList.add('active');
 }
 
+// Build the /api/search query string for the last search.
+// Parameters are kept in the server's canonical order to avoid a redirect.
+function searchQuery(options = {}) {
+    const query = new URLSearchParams({
+        countryCode: lastSearchParams.countryCode,
+        productType: lastSearchParams.productType,
+        minPrice: parseInt(lastSearchParams.minPrice),
+        maxPrice: parseInt(lastSearchParams.maxPrice)
+    });
+    
+    for (const name of ['page', 'limit', 'source']) {
+        if (options[name] && !(name === 'page' && options[name] === 1)) {
+            query.append(name, options[name]);
+        }
+    }
+    return query.toString();
+}
+
+// Render a single product card
+function renderProductCard(product) {
+    return `
+        <div class="product-card">
+            <img class="product-image" 
+                 src="${product.image || '/static/images/placeholder.png'}" 
+                 alt="${product.title}"
+                 onerror="this.src='https://via.placeholder.com/280x200?text=No+Image'">
+            <div class="product-info">
+                <h3 class="product-title">${product.title || 'Untitled Product'}</h3>
+                <div class="product-price">${product.currency} ${formatPrice(product.price)}</div>
+                <a href="${product.link}" target="_blank" rel="noopener noreferrer" class="product-link">
+                    View Details
+                </a>
+            </div>
+        </div>
+    `;
+}
+
+// Fetch the next page for one source and append it without re-rendering the grid
+async function loadMore(source, row) {
+    if (!lastSearchParams) return;
+    
+    const button = row.querySelector('.load-more-btn');
+    button.disabled = true;
+    
+    const nextPage = (sourcePages[source] || 1) + 1;
+    const query = searchQuery({ page: nextPage, limit: PAGE_SIZE, source });
+    
+    try {
+        const response = await fetch(`/api/search?${query}`);
+        
+        const data = await response.json();
+        
+        if (!response.ok) {
+            throw new Error(data.error || 'Failed to load more products');
+        }
+        
+        const products = (data.grouped || {})[source] || [];
+        const page = (data.pagination || {})[source] || { has_more: false };
+        
+        row.insertAdjacentHTML('beforebegin', products.map(renderProductCard).join(''));
+        sourcePages[source] = nextPage;
+        row.hidden = !page.has_more;
+        
+    } catch (error) {
+        showToast(error.message, 'error');
+    } finally {
+        button.disabled = false;
+    }
+}
+
 // Format price with commas
 function formatPrice(price) {
     return new Intl.NumberFormat().format(price);
@@ -0,0 +1,13 @@
+"""
+WSGI entry point: threaded serving mode
+
+Run with a WSGI server, e.g.:
+    gunicorn -w 4 wsgi:app
+
+The background scheduler starts when ENABLE_SCHEDULER is set; set it for
+one process only.
+"""
+
+from app import create_app, ENABLE_SCHEDULER
+
+app = create_app(enable_scheduler=ENABLE_SCHEDULER)